@@ -0,0 +1,190 @@
+"""Memory-mapped documentation index for the MAXScript API.
+
+The index is a single file with a sorted offset table, so looking up
+one symbol is a binary search over the mapped file that only decodes
+the keys it visits and the one record it returns:
+
+    header   magic, entry count, length of the source signature
+    source   signature of the API file the index was built from
+    table    per entry: key offset, key length, record offset, length
+    data     utf-8 keys (lowercase symbols) and records
+
+A record holds the symbol, its signature and a short description,
+separated by RECORD_SEPARATOR.
+"""
+from __future__ import unicode_literals
+
+import json
+import mmap
+import os
+import struct
+
+
+MAGIC = b"MXSDOC01"
+HEADER = struct.Struct("<8sII")
+ENTRY = struct.Struct("<IIII")
+RECORD_SEPARATOR = "\x1f"
+
+
+def parse_docs(lines):
+    """Parse 'symbol<TAB>signature<TAB>description' lines into a dict."""
+    docs = {}
+    for line in lines:
+        fields = line.rstrip("\r\n").split("\t")
+        if len(fields) < 2 or not fields[0]:
+            continue
+        description = fields[2] if len(fields) > 2 else ""
+        docs[fields[0].lower()] = (fields[0], fields[1], description)
+    return docs
+
+
+def collect_entries(names, docs=None):
+    """Return (symbol, signature, description) tuples for the API names.
+
+    Symbols without explicit documentation get a description derived
+    from the symbol list itself. Namespaces like 'polyop' that are not
+    symbols on their own are added as entries listing their size.
+    """
+    docs = docs or {}
+    entries = {}
+    namespaces = {}
+    for name in names:
+        namespace, dot, member = name.rpartition(".")
+        if dot:
+            namespaces[namespace] = namespaces.get(namespace, 0) + 1
+            description = "Member of {0}".format(namespace)
+        else:
+            description = "Global"
+        entries[name.lower()] = docs.get(name.lower(),
+                                         (name, name, description))
+    for namespace, count in namespaces.items():
+        key = namespace.lower()
+        if key not in entries:
+            entries[key] = docs.get(key, (
+                namespace, namespace,
+                "Namespace with {0} members".format(count)))
+    return entries
+
+
+def build(indexfile, entries, signature):
+    """Write the entries dict (lowercase key -> record fields) to disk."""
+    source = json.dumps(list(signature)).encode("utf-8")
+    keys = sorted(entries)
+    data = bytearray()
+    table = []
+    for key in keys:
+        keybytes = key.encode("utf-8")
+        record = RECORD_SEPARATOR.join(entries[key]).encode("utf-8")
+        table.append((len(data), len(keybytes),
+                      len(data) + len(keybytes), len(record)))
+        data += keybytes
+        data += record
+
+    tmpfile = indexfile + ".tmp"
+    indexdir = os.path.dirname(indexfile)
+    if not os.path.isdir(indexdir):
+        os.makedirs(indexdir)
+    with open(tmpfile, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(source)))
+        f.write(source)
+        for entry in table:
+            f.write(ENTRY.pack(*entry))
+        f.write(bytes(data))
+    os.replace(tmpfile, indexfile)
+
+
+class DocIndex(object):
+    """Read-only view on an index file written by build()."""
+
+    def __init__(self, indexfile):
+        self.file = open(indexfile, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            magic, self.count, sourcelen = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                raise ValueError("Not a MAXScript docs index: " + indexfile)
+            source = self.map[HEADER.size:HEADER.size + sourcelen]
+            self.signature = json.loads(source.decode("utf-8"))
+            self.table_offset = HEADER.size + sourcelen
+            self.data_offset = self.table_offset + self.count * ENTRY.size
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if getattr(self, "map", None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(
+            self.map, self.table_offset + position * ENTRY.size)
+
+    def _read(self, offset, length):
+        start = self.data_offset + offset
+        return self.map[start:start + length]
+
+    def lookup(self, symbol):
+        """Return (symbol, signature, description) or None, ignoring case."""
+        key = symbol.lower().encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            keyoffset, keylength, recoffset, reclength = self._entry(middle)
+            current = self._read(keyoffset, keylength)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                record = self._read(recoffset, reclength).decode("utf-8")
+                return tuple(record.split(RECORD_SEPARATOR, 2))
+        return None
+
+
+class MemoryDocIndex(object):
+    """Entries kept in memory when the index file cannot be written."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, symbol):
+        """Return (symbol, signature, description) or None, ignoring case."""
+        record = self.entries.get(symbol.lower())
+        return tuple(record) if record is not None else None
+
+
+def open_index(indexfile, signature, get_entries):
+    """Return the DocIndex in indexfile, (re)building it if outdated.
+
+    get_entries is only called when the index has to be built. If that
+    fails, e.g. as the cache folder is not writable, a MemoryDocIndex is
+    returned instead.
+    """
+    # Compare in the form the signature takes after being stored.
+    expected = json.loads(json.dumps(list(signature)))
+    try:
+        index = DocIndex(indexfile)
+    except (IOError, OSError, ValueError, struct.error):
+        index = None
+    if index is not None and index.signature == expected:
+        return index
+    if index is not None:
+        index.close()
+    entries = get_entries()
+    try:
+        build(indexfile, entries, signature)
+        return DocIndex(indexfile)
+    except (IOError, OSError, ValueError, struct.error):
+        return MemoryDocIndex(entries)
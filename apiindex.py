@@ -0,0 +1,165 @@
+"""Prefix index over the MAXScript API used for auto-completion."""
+from __future__ import unicode_literals
+
+import bisect
+import marshal
+import os
+
+# Bump when the layout of the dumped index changes.
+CACHE_FORMAT = 1
+
+
+def _upper_bound(prefix):
+    """Return the smallest string that sorts after all prefixed keys."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ApiIndex(object):
+    """Case-insensitive, sorted index of API names.
+
+    Names are stored sorted by their lowercase form, so all entries that
+    share a prefix form one contiguous slice that can be located with
+    two binary searches instead of scanning the whole API.
+    """
+
+    def __init__(self, names):
+        pairs = sorted(set((name.lower(), name) for name in names if name))
+        self._setup([key for key, _ in pairs],
+                    [name for _, name in pairs],
+                    NamespaceIndex(name for _, name in pairs))
+
+    def _setup(self, keys, names, namespaces):
+        self.keys = keys
+        self.names = names
+        self._members = frozenset(names)
+        self.namespaces = namespaces
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(line.strip() for line in lines)
+
+    def dump(self):
+        """Return the index as plain, marshallable data."""
+        return {"keys": self.keys,
+                "names": self.names,
+                "namespaces": self.namespaces.members}
+
+    @classmethod
+    def restore(cls, data):
+        """Recreate an index from dump() output without sorting again."""
+        index = cls.__new__(cls)
+        index._setup(data["keys"], data["names"],
+                     NamespaceIndex.restore(data["namespaces"]))
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._members
+
+    def span(self, prefix):
+        """Return the (start, stop) slice of names matching prefix."""
+        if not prefix:
+            return 0, len(self.keys)
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        stop = bisect.bisect_left(self.keys, _upper_bound(prefix), start)
+        return start, stop
+
+    def find(self, prefix):
+        """Return all names starting with prefix, ignoring case."""
+        start, stop = self.span(prefix)
+        return self.names[start:stop]
+
+
+class NamespaceIndex(object):
+    """Map of lowercase namespaces to their sorted members.
+
+    'polyop.getVert' is stored as member 'getVert' of namespace 'polyop',
+    so completing after a dot is one dict lookup plus a binary search
+    on the typed member prefix.
+    """
+
+    def __init__(self, names):
+        members = {}
+        for name in names:
+            namespace, dot, member = name.rpartition(".")
+            if not dot:
+                continue
+            members.setdefault(namespace.lower(), []).append(
+                (member.lower(), name))
+        for entries in members.values():
+            entries.sort()
+        self._setup(members)
+
+    def _setup(self, members):
+        self.members = members
+        self.keys = dict((namespace, [key for key, _ in entries])
+                         for namespace, entries in members.items())
+
+    @classmethod
+    def restore(cls, members):
+        index = cls.__new__(cls)
+        index._setup(members)
+        return index
+
+    def __contains__(self, namespace):
+        return namespace.lower() in self.members
+
+    def find(self, namespace, prefix=""):
+        """Return full names in namespace whose member starts with prefix."""
+        namespace = namespace.lower()
+        entries = self.members.get(namespace)
+        if not entries:
+            return []
+        keys = self.keys[namespace]
+        start, stop = 0, len(keys)
+        if prefix:
+            prefix = prefix.lower()
+            start = bisect.bisect_left(keys, prefix)
+            stop = bisect.bisect_left(keys, _upper_bound(prefix), start)
+        return [name for _, name in entries[start:stop]]
+
+
+def load_cache(cachefile, signature):
+    """Return the ApiIndex stored in cachefile or None.
+
+    The cache is only used if it was written for the same signature,
+    which identifies the state of the API source it was built from.
+    """
+    try:
+        # marshal.loads() on the whole content is several times faster
+        # than marshal.load(), which reads the file object piecewise.
+        with open(cachefile, "rb") as f:
+            data = marshal.loads(f.read())
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if data.get("format") != CACHE_FORMAT:
+        return None
+    if data.get("signature") != list(signature):
+        return None
+    try:
+        return ApiIndex.restore(data["index"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def save_cache(cachefile, signature, index):
+    """Write index to cachefile, tagged with the source signature."""
+    data = {"format": CACHE_FORMAT,
+            "signature": list(signature),
+            "index": index.dump()}
+    tmpfile = cachefile + ".tmp"
+    try:
+        cachedir = os.path.dirname(cachefile)
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        with open(tmpfile, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmpfile, cachefile)
+    except (IOError, OSError, ValueError):
+        # A missing cache only costs us the next startup, so never fail.
+        pass
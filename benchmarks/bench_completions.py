@@ -0,0 +1,162 @@
+"""Per-keystroke latency of auto-completion on plain CPython.
+
+Types a few traces character by character into a synthetic MAXScript
+view and reports p50/p99 latency and peak allocation of each step:
+
+    python benchmarks/bench_completions.py --lines 50000 --api-size 7300
+
+Sublime runs on_modified_async off the UI thread, so it is reported
+separately from on_query_completions, which blocks typing. Each trace is
+typed twice, as in Sublime 3 and as in Sublime 4:
+
+    ST3  on_modified_async computes the completions ahead, so
+         on_query_completions is a cache hit. The cold query shows
+         what it costs when the cache has nothing for the view yet.
+    ST4  on_query_completions returns a CompletionList that is
+         filled in by the worker, timed until it was delivered.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+import sublime  # noqa: E402
+
+
+TRACES = ["polyOp.getVert", "meshop.get", "myRigController", "getNodeCount"]
+
+
+def query_cold(main, listener, view, prefix, locations):
+    """Query completions with nothing cached for the view."""
+    harness.module("completioncache").discard_cache(view)
+    return listener.on_query_completions(view, prefix, locations)
+
+
+def query_sublime4(listener, view, prefix, locations):
+    """Query completions and check they were delivered."""
+    completions = listener.on_query_completions(view, prefix, locations)
+    assert completions.completions is not None
+    return completions
+
+
+def get_steps(main, listener, view, prefix, location, sublime4):
+    """Return (name, func, args) of the steps run per keystroke."""
+    dotfilter = harness.module("filters").DotFilter()
+    steps = [("on_modified_async", listener.on_modified_async, (view,))]
+    if sublime4:
+        steps.append(("on_query_completions", query_sublime4,
+                      (listener, view, prefix, [location])))
+    else:
+        steps.append(("on_query_completions", listener.on_query_completions,
+                      (view, prefix, [location])))
+        steps.append(("on_query_completions cold", query_cold,
+                      (main, listener, view, prefix, [location])))
+    steps.append(("DotFilter.filter", dotfilter.filter,
+                  (view, prefix, [location], [])))
+    return steps
+
+
+def type_trace(main, view, trace, allocations, sublime4=False):
+    """Type trace at the end of the buffer, return timings per step."""
+    listener = main.Completions()
+    timings = {}
+    peaks = {}
+
+    view.insert(view.size(), "\n    ")
+    listener.on_modified_async(view)
+    for char in trace:
+        view.insert(view.size(), char)
+        location = view.sel()[0].b
+        prefix = view.substr(view.word(location))
+        for name, func, args in get_steps(main, listener, view, prefix,
+                                          location, sublime4):
+            if allocations:
+                peaks.setdefault(name, []).append(
+                    harness.measure_allocation(func, *args))
+            else:
+                seconds, _ = harness.measure(func, *args)
+                timings.setdefault(name, []).append(seconds)
+    return timings, peaks
+
+
+def run(lines, api_size, repeat, allocations, traces):
+    main = harness.setup(api_size=api_size)
+    rows = []
+
+    seconds, api_lines = harness.measure(main._get_api_lines)
+    rows.append(("_get_api_lines", "-", [seconds], []))
+    seconds, _ = harness.measure(main._get_api_index)
+    rows.append(("_get_api_index (cold)", "-", [seconds], []))
+    main.api_index = None
+    seconds, _ = harness.measure(main._get_api_index)
+    rows.append(("_get_api_index (cached)", "-", [seconds], []))
+
+    text = harness.make_script(lines)
+    for sublime4 in (False, True):
+        sublime.use_sublime4(sublime4)
+        edition = "ST4 " if sublime4 else "ST3 "
+        try:
+            for trace in traces:
+                collected = {}
+                collected_peaks = {}
+                for _ in range(repeat):
+                    harness.reset(main)
+                    view = sublime.View(text, file_name="bench.ms")
+                    timings, _ = type_trace(main, view, trace, False,
+                                            sublime4)
+                    peaks = {}
+                    if allocations:
+                        harness.reset(main)
+                        view = sublime.View(text, file_name="bench.ms")
+                        _, peaks = type_trace(main, view, trace, True,
+                                              sublime4)
+                    for name in timings:
+                        collected.setdefault(name, []).extend(timings[name])
+                        collected_peaks.setdefault(name, []).extend(
+                            peaks.get(name, []))
+                for name in sorted(collected):
+                    rows.append((edition + name, trace, collected[name],
+                                 collected_peaks[name]))
+        finally:
+            sublime.use_sublime4(False)
+    return len(api_lines), rows
+
+
+def report(rows):
+    print("{0:<30} {1:<18} {2:>6} {3:>10} {4:>10} {5:>11}".format(
+        "step", "trace", "n", "p50 ms", "p99 ms", "peak KiB"))
+    for name, trace, seconds, peaks in rows:
+        peak = (sum(peaks) / float(len(peaks)) / 1024.0) if peaks else 0.0
+        print("{0:<30} {1:<18} {2:>6} {3:>10.3f} {4:>10.3f} {5:>11.1f}".format(
+            name, trace, len(seconds),
+            harness.percentile(seconds, 0.5) * 1000,
+            harness.percentile(seconds, 0.99) * 1000,
+            peak))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--lines", type=int, default=5000,
+                        help="lines in the synthetic view")
+    parser.add_argument("--api-size", type=int, default=None,
+                        help="synthetic API entries, default: maxscript.api")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="times each trace is typed")
+    parser.add_argument("--trace", action="append", dest="traces",
+                        help="text to type, may be given multiple times")
+    parser.add_argument("--allocations", action="store_true",
+                        help="also measure peak allocations (slower)")
+    args = parser.parse_args(argv)
+
+    api_lines, rows = run(args.lines, args.api_size, args.repeat,
+                          args.allocations, args.traces or TRACES)
+    print("view: {0} lines, api: {1} entries".format(args.lines, api_lines))
+    report(rows)
+
+
+if __name__ == "__main__":
+    main()
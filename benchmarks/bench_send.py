@@ -0,0 +1,114 @@
+"""Latency of sending code to 3ds Max, on a simulated Win32 desktop.
+
+Builds a desktop of unrelated windows and 3ds Max instances with
+fakewin and reports p50/p99 latency of the steps of a send:
+
+    python benchmarks/bench_send.py --windows 5000 --instances 4
+
+--latency delays every window message, to see how the plugin behaves
+with a busy 3ds Max.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+import sublime  # noqa: E402
+
+
+SELECTION = "\n".join("    local v{0} = polyop.getVert $ {0}".format(index)
+                      for index in range(20))
+
+
+def measure_steps(main, desktop, sends):
+    winapi = harness.module("winapi")
+    discovery = harness.module("discovery")
+    timings = {}
+
+    def run(name, func, *args):
+        seconds, result = harness.measure(func, *args)
+        timings.setdefault(name, []).append(seconds)
+        return result
+
+    for _ in range(sends):
+        run("discovery.scan", discovery.discovery.scan)
+        run("Window.find_windows", winapi.Window.find_windows,
+            "Autodesk 3ds Max")
+
+    instances = discovery.discovery.get_instances(wait=True)
+    window = instances[0].window
+    for _ in range(sends):
+        run("Window.find_child", window.find_child, None, "MXS_Scintilla")
+
+    main.mainwindow = window
+    for index in range(sends):
+        main.current_transport = None
+        run("_send_cmd_to_max (cold)", main._send_cmd_to_max,
+            "print {0}\r\n".format(index))
+    for index in range(sends):
+        run("_send_cmd_to_max (warm)", main._send_cmd_to_max,
+            "print {0}\r\n".format(index))
+
+    tail = main.current_transport.get_output_tail()
+    for index in range(sends):
+        main._send_cmd_to_max("print {0}\r\n".format(index))
+        run("ScintillaTail.read", tail.read)
+
+    view = sublime.View(SELECTION, file_name="bench.ms")
+    view.sel().clear()
+    view.sel().add(sublime.Region(0, view.size()))
+    command = main.SendSelectionToMaxCommand(view)
+    for index in range(sends):
+        # Vary the code so that sends are neither coalesced nor reused.
+        view.insert(0, "-- {0}\n".format(index))
+        view.sel().clear()
+        view.sel().add(sublime.Region(0, view.size()))
+        run("send_selection_to_max (enqueue)", command.run, None)
+        run("send_selection_to_max (delivered)", main.send_queue.wait)
+    return timings
+
+
+def run(windows, instances, latency, sends):
+    main = harness.setup(api_size=100)
+    sublime.load_settings(
+        harness.module("constants").SETTINGS_FILENAME).set(
+            "listener_output", False)
+    desktop = harness.use_desktop(max_instances=instances, noise=windows,
+                                  latency=latency)
+    return measure_steps(main, desktop, sends)
+
+
+def report(timings):
+    print("{0:<36} {1:>6} {2:>10} {3:>10}".format(
+        "step", "n", "p50 ms", "p99 ms"))
+    for name, seconds in timings.items():
+        print("{0:<36} {1:>6} {2:>10.3f} {3:>10.3f}".format(
+            name, len(seconds),
+            harness.percentile(seconds, 0.5) * 1000,
+            harness.percentile(seconds, 0.99) * 1000))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--windows", type=int, default=2000,
+                        help="unrelated top-level windows on the desktop")
+    parser.add_argument("--instances", type=int, default=2,
+                        help="3ds Max instances on the desktop")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds each window message takes")
+    parser.add_argument("--sends", type=int, default=50,
+                        help="times each step is measured")
+    args = parser.parse_args(argv)
+
+    timings = run(args.windows, args.instances, args.latency, args.sends)
+    print("desktop: {0} windows, {1} 3ds Max instances, {2}s latency".format(
+        args.windows, args.instances, args.latency))
+    report(timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Time to index the MAXScript definitions of a large workspace.
+
+Writes a folder of synthetic scripts and reports how long the symbol
+index takes to build from scratch, to load from its cache and bring up
+to date with nothing changed, and after touching a few files:
+
+    python benchmarks/bench_symbols.py --files 3000 --lines 300
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+
+def write_workspace(files, lines):
+    """Write files scripts into a new folder spread over subfolders."""
+    folder = tempfile.mkdtemp(prefix="sublime3dsmax-workspace-")
+    for index in range(files):
+        subfolder = os.path.join(folder, "tool{0}".format(index // 100))
+        if not os.path.isdir(subfolder):
+            os.makedirs(subfolder)
+        path = os.path.join(subfolder, "script{0}.ms".format(index))
+        with open(path, "w") as f:
+            f.write(harness.make_script(lines, seed=index))
+    return folder
+
+
+def run(files, lines, touched, workers):
+    harness.setup(api_size=100)
+    symbolindex = harness.module("symbolindex")
+    folder = write_workspace(files, lines)
+    cachefile = os.path.join(folder + ".symbols")
+    timings = []
+    try:
+        index = symbolindex.SymbolIndex([folder])
+        seconds, parsed = harness.measure(index.update, workers)
+        timings.append(("cold update", seconds, parsed))
+        symbolindex.save_cache(cachefile, index)
+
+        start = time.time()
+        index = symbolindex.load_cache(cachefile, [folder])
+        parsed = index.update(workers)
+        timings.append(("warm load_cache + update", time.time() - start,
+                        parsed))
+
+        scripts = symbolindex.find_scripts([folder])[:touched]
+        for path in scripts:
+            with open(path, "a") as f:
+                f.write("\nfn touched = 1\n")
+        seconds, parsed = harness.measure(index.update, workers)
+        timings.append(("update after edits", seconds, parsed))
+        timings.append(("symbols", 0, sum(len(entry[2])
+                                          for entry in index.files.values())))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        if os.path.exists(cachefile):
+            os.remove(cachefile)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=3000,
+                        help="scripts in the workspace")
+    parser.add_argument("--lines", type=int, default=300,
+                        help="lines per script")
+    parser.add_argument("--touched", type=int, default=10,
+                        help="scripts changed before the last update")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads parsing scripts")
+    args = parser.parse_args(argv)
+
+    print("{0:<28} {1:>10} {2:>8}".format("step", "ms", "files"))
+    for name, seconds, count in run(args.files, args.lines, args.touched,
+                                    args.workers):
+        print("{0:<28} {1:>10.1f} {2:>8}".format(name, seconds * 1000,
+                                                 count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Regression cases for splitting MAXScript into top-level blocks.
+
+send_changes_to_max only sends the definitions mxsblocks finds changed,
+so a block cut short silently redefines a function without part of its
+body. Run after touching mxsblocks.py:
+
+    python benchmarks/check_blocks.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+
+mxsblocks = harness.module("mxsblocks")
+
+
+def get_spans(text):
+    return [(block.start, block.end, block.kind, block.name)
+            for block in mxsblocks.split_blocks(text)]
+
+
+def get_changed(old, new):
+    blocks = mxsblocks.get_changed_blocks(old, new)
+    return None if blocks is None else [block.text for block in blocks]
+
+
+def check_definitions():
+    """fn, struct, rollout and macroScript blocks and other code"""
+    text = "\n".join([
+        "global counter = 0",
+        "fn add a b = (",
+        "    a + b",
+        ")",
+        "struct Foo",
+        "(",
+        "    bar = \")\",  -- a ( in a comment",
+        "    fn baz = 1",
+        ")",
+        "rollout ro \"Title\" ( button b \"(\" )",
+        "macroScript Tool category:\"Cat\" ( print 1 )",
+        "createDialog ro"])
+    spans = get_spans(text)
+    assert spans == [(0, 0, None, None), (1, 3, "fn", "add"),
+                     (4, 8, "struct", "Foo"), (9, 9, "rollout", "ro"),
+                     (10, 10, "macroscript", "Tool"),
+                     (11, 11, None, None)], spans
+
+
+def check_else_continues():
+    """A line starting with else continues the statement before it"""
+    old = "fn sign x =\n    if x < 0 then -1\n    else 1\nfn other = 2"
+    new = old.replace("-1", "-2")
+    changed = get_changed(old, new)
+    assert changed == ["fn sign x =\n    if x < 0 then -2\n    else 1"], \
+        changed
+    unindented = "fn sign x = if x < 0 then -1\nelse 1"
+    assert get_spans(unindented) == [(0, 1, "fn", "sign")], \
+        get_spans(unindented)
+
+
+def check_catch_continues():
+    """try and its catch on the next line are one statement"""
+    text = "try (foo())\ncatch (print \"failed\")\nfn f = 1"
+    assert get_spans(text) == [(0, 1, None, None), (2, 2, "fn", "f")], \
+        get_spans(text)
+    fn = "fn safe =\ntry (foo())\ncatch (bar())\nfn f = 1"
+    assert get_spans(fn) == [(0, 2, "fn", "safe"), (3, 3, "fn", "f")], \
+        get_spans(fn)
+
+
+def check_trailing_operators():
+    """A line ending in an operator or keyword continues on the next"""
+    text = "fn f x = x +\n2\nfor i in 1 to 3 do\nprint i\nfn g = 1"
+    assert get_spans(text) == [(0, 1, "fn", "f"), (2, 3, None, None),
+                               (4, 4, "fn", "g")], get_spans(text)
+
+
+def check_indented_body():
+    """Indented lines belong to the definition above them, not to code"""
+    text = "\n".join([
+        "fn scale x =",
+        "    local factor = 2",
+        "    x * factor",
+        "print (scale 2)",
+        "    print 3"])
+    spans = get_spans(text)
+    assert spans == [(0, 2, "fn", "scale"), (3, 3, None, None),
+                     (4, 4, None, None)], spans
+
+
+def check_unclosed_falls_back():
+    """A changed definition cut off by the end of the file sends all"""
+    old = "fn a = 1\nfn b = (\n    2\n)"
+    assert get_changed(old, old.replace("2", "3")) == \
+        ["fn b = (\n    3\n)"]
+    assert get_changed(old, old[:-1]) is None
+    assert get_changed(old, old + "\nfn c =") is None
+    assert get_changed(old, old + "\nfn c = \"open string") is None
+
+
+def check_other_code_falls_back():
+    """Changed code outside of definitions sends the whole file"""
+    old = "fn a = 1\nglobal x = 1"
+    assert get_changed(old, old.replace("x = 1", "x = 2")) is None
+    assert get_changed(old, old + "\nfn b = 2") == ["fn b = 2"]
+
+
+def main():
+    checks = [check_definitions, check_else_continues,
+              check_catch_continues, check_trailing_operators,
+              check_indented_body, check_unclosed_falls_back,
+              check_other_code_falls_back]
+    sys.exit(1 if harness.run_checks(checks) else 0)
+
+
+if __name__ == "__main__":
+    main()
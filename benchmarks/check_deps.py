@@ -0,0 +1,156 @@
+"""Regression cases for following fileIn and include between scripts.
+
+send_stale_files_to_max only sends the scripts mxsdeps finds changed,
+in the order it finds, so a wrong unit or order sends stale code. Run
+after touching mxsdeps.py:
+
+    python benchmarks/check_deps.py
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+
+mxsdeps = harness.module("mxsdeps")
+
+
+class Workspace(object):
+    """A folder of scripts, removed again by close()."""
+
+    def __init__(self, files):
+        self.folder = tempfile.mkdtemp(prefix="sublime3dsmax-deps-")
+        for name, text in files.items():
+            self.write(name, text)
+
+    def path(self, name):
+        return os.path.normcase(os.path.abspath(
+            os.path.join(self.folder, name)))
+
+    def write(self, name, text):
+        path = self.path(name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # Changes must show in the mtime or size to be noticed.
+        if os.path.exists(path):
+            time.sleep(0.01)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def names(self, units):
+        return [os.path.relpath(unit.path, self.folder).replace(os.sep, "/")
+                for unit in units]
+
+    def close(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def check_parse_statements():
+    """Literal paths are found, ones in comments or computed are not"""
+    text = "\n".join([
+        'fileIn "lib\\\\utils.ms"',
+        'include @"C:\\tools\\part.ms"',
+        '-- fileIn "commented.ms"',
+        '/* include "block.ms" */',
+        'fileIn (getDir #scripts + "\\\\computed.ms")',
+        'FILEIN "upper.ms"'])
+    statements = mxsdeps.parse_statements(text)
+    assert statements == [("filein", "lib\\utils.ms"),
+                          ("include", "C:\\tools\\part.ms"),
+                          ("filein", "upper.ms")], statements
+
+
+def check_include_and_filein_units():
+    """Included files belong to their unit, fileIns are units of their own"""
+    workspace = Workspace({
+        "main.ms": 'fileIn "lib/utils.ms"\ninclude "part.ms"\nfn m = 1',
+        "part.ms": 'fileIn "lib/other.ms"\nrollout r "R" ()',
+        "lib/utils.ms": "fn u = 1",
+        "lib/other.ms": "fn o = 1"})
+    try:
+        graph = mxsdeps.DependencyGraph()
+        order = graph.get_load_order(workspace.path("main.ms"))
+        names = workspace.names(order)
+        assert names == ["lib/utils.ms", "lib/other.ms", "main.ms"], names
+
+        loaded = mxsdeps.LoadedFiles()
+        loaded.mark(order)
+        workspace.write("part.ms", 'fileIn "lib/other.ms"\nrollout r "X" ()')
+        order = graph.get_load_order(workspace.path("main.ms"))
+        stale = workspace.names(loaded.get_stale_units(order))
+        assert stale == ["main.ms"], stale
+
+        loaded.mark(order)
+        workspace.write("lib/utils.ms", "fn u = 2")
+        order = graph.get_load_order(workspace.path("main.ms"))
+        stale = workspace.names(loaded.get_stale_units(order))
+        assert stale == ["lib/utils.ms"], stale
+    finally:
+        workspace.close()
+
+
+def check_covered_units():
+    """A changed unit loaded by another changed unit is not sent twice"""
+    workspace = Workspace({
+        "main.ms": 'fileIn "tool.ms"\nfn m = 1',
+        "tool.ms": 'fileIn "lib.ms"\nfn t = 1',
+        "lib.ms": "fn l = 1"})
+    try:
+        graph = mxsdeps.DependencyGraph()
+        loaded = mxsdeps.LoadedFiles()
+        loaded.mark(graph.get_load_order(workspace.path("main.ms")))
+        workspace.write("tool.ms", 'fileIn "lib.ms"\nfn t = 2')
+        workspace.write("lib.ms", "fn l = 2")
+        order = graph.get_load_order(workspace.path("main.ms"))
+        stale = workspace.names(loaded.get_stale_units(order))
+        assert stale == ["tool.ms"], stale
+    finally:
+        workspace.close()
+
+
+def check_cycles():
+    """Cyclic fileIns and includes terminate and list every unit once"""
+    workspace = Workspace({
+        "a.ms": 'fileIn "b.ms"\nfn a = 1',
+        "b.ms": 'fileIn "c.ms"\nfn b = 1',
+        "c.ms": 'fileIn "a.ms"\ninclude "d.ms"\nfn c = 1',
+        "d.ms": 'include "c.ms"\nfn d = 1'})
+    try:
+        graph = mxsdeps.DependencyGraph()
+        order = graph.get_load_order(workspace.path("a.ms"))
+        names = workspace.names(order)
+        assert names == ["c.ms", "b.ms", "a.ms"], names
+        units = dict(zip(names, order))
+        assert units["c.ms"].children == [], units["c.ms"].children
+    finally:
+        workspace.close()
+
+
+def check_missing_files():
+    """Missing scripts are skipped, a missing root has no units"""
+    workspace = Workspace({"main.ms": 'fileIn "gone.ms"\nfn m = 1'})
+    try:
+        graph = mxsdeps.DependencyGraph()
+        order = graph.get_load_order(workspace.path("main.ms"))
+        assert workspace.names(order) == ["main.ms"], workspace.names(order)
+        order = graph.get_load_order(workspace.path("nothing.ms"))
+        assert order == [], order
+    finally:
+        workspace.close()
+
+
+def main():
+    checks = [check_parse_statements, check_include_and_filein_units,
+              check_covered_units, check_cycles, check_missing_files]
+    sys.exit(1 if harness.run_checks(checks) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Load the plugin outside of Sublime for benchmarking.
+
+The stub sublime/sublime_plugin modules from ./stubs are put on the
+path and the package folder is imported under PACKAGE, just like
+Sublime imports it under the name of the package folder.
+"""
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import types
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PACKAGE = "sublime3dsmax_bench"
+
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+
+import sublime  # noqa: E402
+
+
+def load_package():
+    """Import the plugin package and return its main module."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    main = __import__(PACKAGE + ".sublime3dsmax", fromlist=["*"])
+    winapi = sys.modules[PACKAGE + ".winapi"]
+    fakewin = __import__(PACKAGE + ".fakewin", fromlist=["*"])
+    # Never touch the real desktop, even on Windows.
+    if not isinstance(winapi.backend, fakewin.FakeDesktop):
+        winapi.set_backend(fakewin.FakeDesktop())
+    return main
+
+
+def module(name):
+    load_package()
+    return __import__(PACKAGE + "." + name, fromlist=["*"])
+
+
+def use_desktop(max_instances=0, noise=0, latency=0.0):
+    """Replace the Win32 API by a simulated desktop and return it.
+
+    Without max_instances no 3ds Max is ever found, which is all
+    completion needs.
+    """
+    fakewin = module("fakewin")
+    desktop = fakewin.FakeDesktop(latency=latency)
+    desktop.add_noise(noise)
+    for index in range(max_instances):
+        desktop.add_max(str(2017 + index % 4))
+    module("winapi").set_backend(desktop)
+    discovery = module("discovery")
+    discovery.discovery.invalidate()
+    return desktop
+
+
+class InlineWorker(object):
+    """Runs completion jobs synchronously, for reproducible timings."""
+
+    def submit(self, key, func, callback=None, on_cancel=None):
+        job = module("completionworker").Job(func, callback, on_cancel)
+        job.run()
+        return job
+
+    def cancel(self, key):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+def install_inline_worker():
+    module("completionworker").worker = InlineWorker()
+
+
+# -- synthetic data -------------------------------------------------------
+
+NAMESPACES = ["polyop", "meshop", "pathConfig", "LayerManager", "rollout",
+              "skinOps", "Biped", "callbacks", "trackView", "sysInfo"]
+SYLLABLES = ["get", "set", "vert", "face", "edge", "map", "node", "count",
+             "pos", "sel", "flag", "num", "by", "using", "poly", "color",
+             "weight", "bone", "key", "time"]
+
+
+def make_name(rng, parts=3):
+    words = [rng.choice(SYLLABLES) for _ in range(rng.randint(1, parts))]
+    return words[0] + "".join(w.capitalize() for w in words[1:])
+
+
+def make_api(size, seed=0):
+    """Return size API names, about a third of them dotted."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < size:
+        name = make_name(rng, 4)
+        if rng.random() < 0.35:
+            name = rng.choice(NAMESPACES) + "." + name
+        names.add(name)
+    return sorted(names)
+
+
+def write_api(names, directory=None):
+    """Write names as a maxscript.api file and return its path."""
+    directory = directory or tempfile.mkdtemp(prefix="sublime3dsmax-api-")
+    apipath = os.path.join(directory, "maxscript.api")
+    with open(apipath, "w") as f:
+        f.write("\n".join(names))
+    return apipath
+
+
+def make_script(lines, seed=0):
+    """Return MAXScript-like source text with the given number of lines."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < lines:
+        fn = make_name(rng)
+        out.append("fn {0} obj = (".format(fn))
+        for _ in range(rng.randint(2, 8)):
+            out.append("    local {0} = polyop.{1} obj {2}".format(
+                make_name(rng), make_name(rng), rng.randint(0, 99)))
+        out.append(")")
+    return "\n".join(out[:lines])
+
+
+def setup(api_size=None, apipath=None):
+    """Load the plugin and point it at the given or a synthetic API.
+
+    Returns the plugin's main module.
+    """
+    main = load_package()
+    constants = module("constants")
+    if apipath is None:
+        if api_size is None:
+            apipath = os.path.join(ROOT, "maxscript.api")
+        else:
+            apipath = write_api(make_api(api_size))
+    constants.APIPATH = apipath
+    sublime.set_cache_path(tempfile.mkdtemp(prefix="sublime3dsmax-cache-"))
+    main.temp_store.directory = tempfile.mkdtemp(prefix="sublime3dsmax-temp-")
+    reset(main)
+    install_inline_worker()
+    return main
+
+
+def reset(main):
+    """Forget everything the plugin has cached in memory."""
+    main.api_index = None
+    main.api_index_path = None
+    main.api_paths.clear()
+    module("bufferindex").indexes.clear()
+    module("completioncache").caches.clear()
+    module("ranking").ranker.usage.clear()
+    module("filters").manager.set_namespace_index(None)
+
+
+# -- measuring -------------------------------------------------------------
+
+def measure(func, *args):
+    """Return (seconds, result) of one call."""
+    start = timeit.default_timer()
+    result = func(*args)
+    return timeit.default_timer() - start, result
+
+
+def measure_allocation(func, *args):
+    """Return peak bytes allocated by Python during one call."""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+# -- checking --------------------------------------------------------------
+
+def run_checks(checks):
+    """Run check functions, report each and return the number failed.
+
+    A check fails by raising AssertionError, its docstring names it.
+    """
+    failed = 0
+    for check in checks:
+        name = (check.__doc__ or check.__name__).strip().split("\n")[0]
+        try:
+            check()
+        except AssertionError as error:
+            failed += 1
+            print("FAIL {0}: {1}".format(name, error))
+        else:
+            print("ok   {0}".format(name))
+    print("{0} of {1} checks failed".format(failed, len(checks)))
+    return failed
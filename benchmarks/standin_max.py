@@ -0,0 +1,144 @@
+"""A stand-in for 3ds Max running the listener server.
+
+Serves max/sublime3dsmax_listener.py without 3ds Max, so the socket
+transport can be tried and benchmarked anywhere:
+
+    python benchmarks/standin_max.py --port 27100
+
+Python code is executed for real, MAXScript is only recorded and echoed
+back as result. Test wrappers of the test runner are understood though,
+their test scripts are run with a tiny subset of MAXScript:
+
+    sleep 0.5                           -- takes that many seconds
+    assert_true false                   -- fails, like assert_false true
+    assert_equal 1 2                    -- fails if the literals differ
+    AssertReporter.LogMessage "text"    -- logs a message
+    throw "text"                        -- raises an error
+
+Several instances on consecutive ports, to try out sharded test runs:
+
+    python benchmarks/standin_max.py --port 27100 --instances 4
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import os
+import re
+import threading
+import time
+import types
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LISTENER = os.path.join(os.path.dirname(HERE), "max",
+                        "sublime3dsmax_listener.py")
+
+FILEIN_RE = re.compile(r'^fileIn @"([^"]*)"')
+MARKER_RE = re.compile(r"^-- sublime3dsmax (test|result): (.*)$", re.M)
+
+
+def load_listener():
+    """Import the listener module by path, it is not part of the package."""
+    module = types.ModuleType("sublime3dsmax_listener")
+    module.__file__ = LISTENER
+    with open(LISTENER) as f:
+        exec(compile(f.read(), LISTENER, "exec"), module.__dict__)
+    return module
+
+
+class StandinMax(object):
+    """Evaluates requests like 3ds Max would, remembering all of them."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.received = []
+        self.lock = threading.Lock()
+        self.listener = load_listener()
+        self.namespace = {"__name__": "__main__"}
+
+    def evaluate(self, language, code):
+        with self.lock:
+            self.received.append((language, code))
+        if self.latency:
+            time.sleep(self.latency)
+        if language == "python":
+            return self.listener.evaluate_python(code, self.namespace)
+        match = FILEIN_RE.match(code)
+        if match and os.path.isfile(match.group(1)):
+            with io.open(match.group(1), encoding="utf-8") as f:
+                markers = dict(MARKER_RE.findall(f.read()))
+            if "test" in markers and "result" in markers:
+                self.run_test(markers["test"], markers["result"])
+        return code, ""
+
+    def run_test(self, script, resultfile):
+        """Run a test script written in the MAXScript subset above."""
+        lines = []
+        with io.open(script, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                words = line.split(None, 1)
+                command = words[0] if words else ""
+                argument = words[1].strip() if len(words) > 1 else ""
+                if command == "sleep":
+                    time.sleep(float(argument))
+                elif command in ("assert_true", "assert_false") and \
+                        argument != ("true" if command == "assert_true"
+                                     else "false"):
+                    lines.append("failure\tAssert failed ({0}, line {1})"
+                                 .format(os.path.basename(script), number))
+                elif command == "assert_equal" and \
+                        len(set(argument.split())) > 1:
+                    lines.append("failure\tAssert failed: {0} ({1}, line {2})"
+                                 .format(argument, os.path.basename(script),
+                                         number))
+                elif command == "AssertReporter.LogMessage":
+                    lines.append("message\t" + argument.strip('"'))
+                elif command == "throw":
+                    lines.append("error\t" + argument.strip('"'))
+                    break
+        with io.open(resultfile, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Start a listener server, port 0 picks any free port."""
+        server = self.listener.ListenerServer(
+            evaluate=self.evaluate, host=host, port=port,
+            port_range=1 if port == 0 else self.listener.PORT_RANGE)
+        return server.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27100)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds each evaluation takes")
+    parser.add_argument("--instances", type=int, default=1,
+                        help="stand-ins to run on consecutive ports")
+    args = parser.parse_args(argv)
+
+    standins = []
+    for index in range(args.instances):
+        standin = StandinMax(args.latency)
+        server = standin.serve(args.host, args.port + index)
+        print("stand-in listening on {0}:{1}".format(server.host,
+                                                     server.port))
+        standins.append((standin, server))
+    try:
+        while True:
+            time.sleep(1)
+            for standin, server in standins:
+                with standin.lock:
+                    received = list(standin.received)
+                    del standin.received[:]
+                for language, code in received:
+                    print("[{0} {1}] {2}".format(server.port, language,
+                                                 code.rstrip()))
+    except KeyboardInterrupt:
+        for _, server in standins:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Minimal stand-in for Sublime's sublime module, for benchmarks only.
+
+Implements just the API surface the plugin uses. The View keeps its
+text as a list of lines plus a Fenwick tree over the line lengths, so
+point <-> (row, col) conversions and single-line edits are O(log n)
+and do not distort the timings of the plugin code running on top.
+"""
+import os
+import tempfile
+
+
+HOVER_TEXT = 1
+HOVER_GUTTER = 2
+HOVER_MARGIN = 3
+HIDE_ON_MOUSE_MOVE_AWAY = 2
+
+_cache_path = tempfile.mkdtemp(prefix="sublime3dsmax-bench-")
+_settings = {}
+_views = [0]
+_version = ["3211"]
+
+# Messages the plugin shows, recorded instead of displayed.
+messages = []
+
+
+def version():
+    return _version[0]
+
+
+class _CompletionList(object):
+    """Sublime 4's CompletionList, only there after use_sublime4()."""
+
+    def __init__(self, completions=None, flags=0):
+        self.completions = completions
+        self.flags = flags
+
+    def set_completions(self, completions, flags=0):
+        self.completions = completions
+        self.flags = flags
+
+
+def use_sublime4(enabled=True):
+    """Add the Sublime 4 only API the plugin checks for, or remove it."""
+    module = globals()
+    if enabled:
+        _version[0] = "4126"
+        module["CompletionList"] = _CompletionList
+        module["DYNAMIC_COMPLETIONS"] = 8
+    else:
+        _version[0] = "3211"
+        module.pop("CompletionList", None)
+        module.pop("DYNAMIC_COMPLETIONS", None)
+
+
+def cache_path():
+    return _cache_path
+
+
+def set_cache_path(path):
+    global _cache_path
+    _cache_path = path
+
+
+def status_message(msg):
+    messages.append(("status", msg))
+
+
+def error_message(msg):
+    messages.append(("error", msg))
+
+
+def message_dialog(msg):
+    messages.append(("dialog", msg))
+
+
+def set_timeout(callback, delay=0):
+    callback()
+
+
+def set_timeout_async(callback, delay=0):
+    callback()
+
+
+def active_window():
+    return Window()
+
+
+class Settings(object):
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+def load_settings(name):
+    return Settings(_settings.setdefault(name, {}))
+
+
+class Region(object):
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+    def empty(self):
+        return self.a == self.b
+
+    def __eq__(self, other):
+        return (self.a, self.b) == (other.a, other.b)
+
+    def __repr__(self):
+        return "Region({0}, {1})".format(self.a, self.b)
+
+
+class Selection(object):
+
+    def __init__(self):
+        self.regions = []
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __iter__(self):
+        return iter(list(self.regions))
+
+    def __getitem__(self, index):
+        return self.regions[index]
+
+    def clear(self):
+        self.regions = []
+
+    def add(self, region):
+        self.regions.append(region)
+        self.regions.sort(key=Region.begin)
+
+
+class _Fenwick(object):
+    """Prefix sums over line lengths (including their newline)."""
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] * (self.size + 1)
+        for index, value in enumerate(values):
+            self.add(index, value)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count):
+        """Sum of the first count values."""
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def find(self, point):
+        """Return the largest count whose prefix sum is <= point."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] <= point:
+                position = following
+                point -= self.tree[following]
+            step >>= 1
+        return position
+
+
+class View(object):
+    """In-memory text buffer answering the view API used by the plugin."""
+
+    def __init__(self, text="", file_name=None, scope="source.maxscript"):
+        _views[0] += 1
+        self._id = _views[0]
+        self._file_name = file_name
+        self._scope = scope
+        self._change_count = 0
+        self._sel = Selection()
+        self._sel.add(Region(0))
+        self.status = {}
+        self.popups = []
+        self._set_lines(text.split("\n"))
+
+    def _set_lines(self, lines):
+        self.lines = lines
+        self.sums = _Fenwick([len(line) + 1 for line in lines])
+
+    def id(self):
+        return self._id
+
+    def file_name(self):
+        return self._file_name
+
+    def window(self):
+        return Window()
+
+    def size(self):
+        return self.sums.prefix(len(self.lines)) - 1
+
+    def change_count(self):
+        return self._change_count
+
+    def sel(self):
+        return self._sel
+
+    def match_selector(self, point, selector):
+        return selector in self._scope
+
+    def score_selector(self, point, selector):
+        return 1 if selector in self._scope else 0
+
+    def rowcol(self, point):
+        point = max(0, min(point, self.size()))
+        row = min(self.sums.find(point), len(self.lines) - 1)
+        return row, point - self.sums.prefix(row)
+
+    def text_point(self, row, col):
+        row = max(0, min(row, len(self.lines) - 1))
+        return self.sums.prefix(row) + col
+
+    def substr(self, region):
+        if not isinstance(region, Region):
+            return self.substr(Region(region, region + 1))
+        begin, end = region.begin(), min(region.end(), self.size())
+        if begin >= end:
+            return ""
+        first, firstcol = self.rowcol(begin)
+        last, lastcol = self.rowcol(end)
+        if first == last:
+            return self.lines[first][firstcol:lastcol]
+        parts = [self.lines[first][firstcol:]]
+        parts.extend(self.lines[first + 1:last])
+        parts.append(self.lines[last][:lastcol])
+        return "\n".join(parts)
+
+    def line(self, point):
+        if isinstance(point, Region):
+            first = self.line(point.begin())
+            return Region(first.a, self.line(point.end()).b)
+        row, _ = self.rowcol(point)
+        start = self.sums.prefix(row)
+        return Region(start, start + len(self.lines[row]))
+
+    def full_line(self, point):
+        line = self.line(point)
+        return Region(line.a, min(line.b + 1, self.size()))
+
+    def lines_in(self, region):
+        first, _ = self.rowcol(region.begin())
+        last, _ = self.rowcol(region.end())
+        return [self.line(self.text_point(row, 0))
+                for row in range(first, last + 1)]
+
+    def split_by_newlines(self, region):
+        return self.lines_in(region)
+
+    def word(self, point):
+        if isinstance(point, Region):
+            point = point.begin()
+        row, col = self.rowcol(point)
+        text = self.lines[row]
+        start = col
+        while start > 0 and (text[start - 1].isalnum() or
+                             text[start - 1] == "_"):
+            start -= 1
+        end = col
+        while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+            end += 1
+        linestart = self.sums.prefix(row)
+        return Region(linestart + start, linestart + end)
+
+    def extract_completions(self, prefix, location=-1):
+        """Like Sublime, scan the whole buffer for words with prefix."""
+        import re
+        found = []
+        seen = set()
+        lowered = prefix.lower()
+        for line in self.lines:
+            for word in re.findall(r"[A-Za-z_]\w+", line):
+                if word.lower().startswith(lowered) and word not in seen:
+                    seen.add(word)
+                    found.append(word)
+        return found
+
+    def insert(self, point, text):
+        """Insert text at point, move the cursor behind it."""
+        row, col = self.rowcol(point)
+        line = self.lines[row]
+        new = line[:col] + text + line[col:]
+        if "\n" in text:
+            self._set_lines(self.lines[:row] + new.split("\n") +
+                            self.lines[row + 1:])
+        else:
+            self.lines[row] = new
+            self.sums.add(row, len(text))
+        self._change_count += 1
+        self._sel.clear()
+        self._sel.add(Region(point + len(text)))
+
+    def erase(self, region):
+        """Remove the text of region, put the cursor at its start."""
+        begin, end = region.begin(), region.end()
+        first, firstcol = self.rowcol(begin)
+        last, lastcol = self.rowcol(end)
+        if first == last:
+            line = self.lines[first]
+            self.lines[first] = line[:firstcol] + line[lastcol:]
+            self.sums.add(first, -(end - begin))
+        else:
+            merged = self.lines[first][:firstcol] + self.lines[last][lastcol:]
+            self._set_lines(self.lines[:first] + [merged] +
+                            self.lines[last + 1:])
+        self._change_count += 1
+        self._sel.clear()
+        self._sel.add(Region(begin))
+
+    def run_command(self, cmd, args=None):
+        pass
+
+    def set_status(self, key, value):
+        self.status[key] = value
+
+    def erase_status(self, key):
+        self.status.pop(key, None)
+
+    def show_popup(self, content, flags=0, location=-1, max_width=320,
+                   max_height=240, on_navigate=None, on_hide=None):
+        self.popups.append(content)
+
+
+class Window(object):
+
+    def show_quick_panel(self, items, on_select, flags=0,
+                         selected_index=-1, on_highlight=None):
+        on_select(-1)
+
+    def create_output_panel(self, name):
+        return View(scope="text.plain")
+
+    def find_output_panel(self, name):
+        return None
+
+    def run_command(self, cmd, args=None):
+        pass
+
+    def folders(self):
+        return []
+
+    def views(self):
+        return []
+
+    def active_view(self):
+        return None
+
+
+def _ensure_cache_path():
+    if not os.path.isdir(_cache_path):
+        os.makedirs(_cache_path)
+
+
+_ensure_cache_path()
@@ -0,0 +1,65 @@
+"""Sending the same code to several 3ds Max instances at once."""
+from __future__ import unicode_literals
+
+from concurrent import futures
+
+from . import transport
+
+
+class BroadcastResult(object):
+    """Outcome of a broadcast for one 3ds Max instance."""
+
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def broadcast(targets, send, max_workers):
+    """Call send(transport) for all (name, transport) targets concurrently.
+
+    Returns a BroadcastResult per target, in the order of targets. A
+    failing instance does not keep the others from being sent to.
+    """
+    if not targets:
+        return []
+    results = []
+    workers = min(max_workers, len(targets))
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = [(name, pool.submit(send, target))
+                   for name, target in targets]
+        for name, future in pending:
+            try:
+                future.result()
+            except transport.MaxNotFoundError:
+                results.append(BroadcastResult(name, "3ds Max not found"))
+            except transport.RecorderNotFoundError:
+                results.append(BroadcastResult(
+                    name, "MAXScript Macro Recorder not found"))
+            except Exception as e:
+                results.append(BroadcastResult(
+                    name, "{0}: {1}".format(e.__class__.__name__, e)))
+            else:
+                results.append(BroadcastResult(name))
+    return results
+
+
+def get_summary(results):
+    failed = sum(1 for result in results if not result.ok)
+    return "Sent to {0} of {1} 3ds Max instances".format(
+        len(results) - failed, len(results))
+
+
+def format_report(results):
+    """Return a text report listing the outcome for every instance."""
+    lines = [get_summary(results) + ":"]
+    for result in results:
+        if result.ok:
+            lines.append("  OK      {0}".format(result.name))
+        else:
+            lines.append("  FAILED  {0}: {1}".format(result.name,
+                                                     result.error))
+    return "\n".join(lines) + "\n"
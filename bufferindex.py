@@ -0,0 +1,227 @@
+"""Incrementally maintained index of the identifiers inside a view."""
+from __future__ import unicode_literals
+
+import bisect
+import re
+import threading
+
+import sublime
+
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w+")
+
+
+def _tokenize(text):
+    return tuple(IDENTIFIER_RE.findall(text))
+
+
+class BufferIndex(object):
+    """Identifiers of one view, kept per line and updated by region.
+
+    Each line's identifiers are remembered, so an edit only needs to
+    retokenize the lines it touched instead of the whole buffer. The
+    vocabulary is kept sorted by its lowercase form to answer prefix
+    queries with a binary search.
+    """
+
+    def __init__(self):
+        self.rows = []
+        # Length of each line and of the whole buffer at the last update,
+        # to check cheaply that an edit only touched the rows re-read.
+        self.lengths = []
+        self.size = 0
+        self.counts = {}
+        self.sorted_words = []
+        self.change_count = None
+        self.selection_rows = None
+        self.changed_rows = None
+        self.lock = threading.Lock()
+
+    def _add(self, words):
+        for word in words:
+            count = self.counts.get(word, 0)
+            if not count:
+                bisect.insort(self.sorted_words, (word.lower(), word))
+            self.counts[word] = count + 1
+
+    def _remove(self, words):
+        for word in words:
+            count = self.counts.get(word, 0) - 1
+            if count > 0:
+                self.counts[word] = count
+                continue
+            self.counts.pop(word, None)
+            entry = (word.lower(), word)
+            pos = bisect.bisect_left(self.sorted_words, entry)
+            if pos < len(self.sorted_words) and \
+                    self.sorted_words[pos] == entry:
+                del self.sorted_words[pos]
+
+    def _read_rows(self, view, first, last):
+        """Return the lines first to last of view."""
+        if last < first:
+            return []
+        region = sublime.Region(view.text_point(first, 0),
+                                view.line(view.text_point(last, 0)).b)
+        return view.substr(region).split("\n")
+
+    def rebuild(self, view):
+        """Tokenize the whole buffer from scratch."""
+        self.rows = []
+        self.counts = {}
+        self.sorted_words = []
+        lines = view.substr(sublime.Region(0, view.size())).split("\n")
+        self.lengths = [len(line) for line in lines]
+        self.size = view.size()
+        for line in lines:
+            words = _tokenize(line)
+            self.rows.append(words)
+            self._add(words)
+        self.change_count = view.change_count()
+
+    def _replace_rows(self, first, old_last, lines):
+        for words in self.rows[first:old_last + 1]:
+            self._remove(words)
+        new_rows = [_tokenize(line) for line in lines]
+        self.rows[first:old_last + 1] = new_rows
+        self.lengths[first:old_last + 1] = [len(line) for line in lines]
+        for words in new_rows:
+            self._add(words)
+
+    def _get_selection_rows(self, view):
+        rows = [view.rowcol(point)[0] for region in view.sel()
+                for point in (region.a, region.b)]
+        if not rows:
+            return None
+        return min(rows), max(rows)
+
+    def note_selection(self, view):
+        """Remember where the selection is while no edit is pending.
+
+        Edits usually happen at the selection, so the rows it spans
+        right before an edit are a good guess which lines changed.
+        """
+        with self.lock:
+            if view.change_count() == self.change_count:
+                self.selection_rows = self._get_selection_rows(view)
+
+    def note_changes(self, first, old_last, delta):
+        """Remember the rows an edit changed, as reported by Sublime 4.
+
+        first to old_last are the replaced rows, delta is the change in
+        line count. Several edits before the next update are merged, the
+        rows of a later edit count after the earlier ones were applied.
+        """
+        with self.lock:
+            if self.changed_rows is not None:
+                noted_first, noted_last, noted_delta = self.changed_rows
+                first = min(first, noted_first)
+                if old_last > noted_last + noted_delta:
+                    old_last -= noted_delta
+                else:
+                    old_last = noted_last
+                delta += noted_delta
+            self.changed_rows = (first, old_last, delta)
+
+    def update(self, view):
+        """Bring the index up to date with the lines that were edited.
+
+        Only the changed rows reported by Sublime 4 or, failing that, the
+        rows of the selection before and after the edit are read again.
+        If the line count or size of the buffer tells that more changed,
+        e.g. after a Replace All, the whole buffer is tokenized again.
+        Sublime 3 cannot tell about an edit away from the selection that
+        keeps both, those words are only picked up by the next rebuild.
+        """
+        with self.lock:
+            self._update(view)
+            self.selection_rows = self._get_selection_rows(view)
+            self.changed_rows = None
+
+    def _guess_rows(self, view):
+        """Return (first, old_last, new_last) of the changed rows or None."""
+        delta = view.rowcol(view.size())[0] + 1 - len(self.rows)
+        if self.changed_rows is not None:
+            first, old_last, noted_delta = self.changed_rows
+            if noted_delta != delta:
+                return None
+        else:
+            before = self.selection_rows
+            after = self._get_selection_rows(view)
+            if before is None or after is None:
+                return None
+            first = min(before[0], after[0])
+            old_last = max(before[1], after[1] - delta)
+        new_last = old_last + delta
+        if old_last >= len(self.rows) or \
+                min(old_last, new_last) < first - 1:
+            return None
+        return first, old_last, new_last
+
+    def _update(self, view):
+        if self.change_count is None:
+            self.rebuild(view)
+            return
+        if view.change_count() == self.change_count:
+            return
+
+        rows = self._guess_rows(view)
+        if rows is None:
+            self.rebuild(view)
+            return
+        first, old_last, new_last = rows
+        lines = self._read_rows(view, first, new_last)
+        # Every line counts with its line break, so this holds even if
+        # the last line of the buffer is among the replaced ones.
+        removed = sum(self.lengths[first:old_last + 1]) + old_last + 1 - first
+        added = sum(len(line) for line in lines) + len(lines)
+        if self.size - removed + added != view.size():
+            self.rebuild(view)
+            return
+        self._replace_rows(first, old_last, lines)
+        self.size = view.size()
+        self.change_count = view.change_count()
+
+    def find(self, prefix):
+        """Return identifiers starting with prefix, ignoring case.
+
+        The prefix itself is left out, it is the word being typed.
+        """
+        with self.lock:
+            if not prefix:
+                return [word for _, word in self.sorted_words]
+            key = prefix.lower()
+            upper = key[:-1] + chr(ord(key[-1]) + 1)
+            start = bisect.bisect_left(self.sorted_words, (key,))
+            stop = bisect.bisect_left(self.sorted_words, (upper,), start)
+            return [word for _, word in self.sorted_words[start:stop]
+                    if word != prefix]
+
+
+# Maps view ids to their BufferIndex.
+indexes = {}
+
+
+def get_index(view):
+    """Return the up to date BufferIndex for view."""
+    index = indexes.get(view.id())
+    if index is None:
+        index = indexes[view.id()] = BufferIndex()
+    index.update(view)
+    return index
+
+
+def note_selection(view):
+    index = indexes.get(view.id())
+    if index is not None:
+        index.note_selection(view)
+
+
+def note_changes(view, first, old_last, delta):
+    index = indexes.get(view.id())
+    if index is not None:
+        index.note_changes(first, old_last, delta)
+
+
+def discard_index(view):
+    indexes.pop(view.id(), None)
@@ -0,0 +1,85 @@
+"""Per-view memoization of auto-completion results."""
+from __future__ import unicode_literals
+
+import collections
+import threading
+
+
+# Number of queries remembered per view.
+MAXSIZE = 32
+
+
+class _LRU(object):
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class CompletionCache(object):
+    """Remember completions of recent queries in one view.
+
+    Ranked results are only valid for the buffer state they were
+    computed in, so they are keyed by (query, change count). The
+    unranked matches of a query are kept independently of the change
+    count: a longer query is answered by narrowing the matches of its
+    longest cached shorter form, which must share the same dotted
+    namespace.
+    """
+
+    def __init__(self, maxsize=MAXSIZE):
+        self.results = _LRU(maxsize)
+        self.matches = _LRU(maxsize)
+
+    def get_result(self, query, change_count):
+        return self.results.get((query.lower(), change_count))
+
+    def put(self, query, change_count, matches, result):
+        query = query.lower()
+        self.matches.put(query, matches)
+        self.results.put((query, change_count), result)
+
+    def get_matches(self, query):
+        """Return cached matches of query or of its longest cached prefix.
+
+        Only prefixes within the same namespace qualify, e.g. 'polyop.ge'
+        may be narrowed from 'polyop.g' or 'polyop.', but not from 'poly'.
+        """
+        query = query.lower()
+        namespace, dot, _ = query.rpartition(".")
+        boundary = len(namespace + dot)
+        for end in range(len(query), boundary - 1, -1):
+            matches = self.matches.get(query[:end])
+            if matches is not None:
+                return matches
+        return None
+
+
+# Maps view ids to their CompletionCache.
+caches = {}
+
+
+def get_cache(view):
+    cache = caches.get(view.id())
+    if cache is None:
+        cache = caches[view.id()] = CompletionCache()
+    return cache
+
+
+def discard_cache(view):
+    caches.pop(view.id(), None)
@@ -0,0 +1,120 @@
+"""Background thread for computing auto-completions."""
+from __future__ import unicode_literals
+
+import collections
+import threading
+import traceback
+
+
+class Cancelled(Exception):
+    """Raised inside a job that has been superseded by a newer one."""
+
+
+class Job(object):
+    """A unit of work that can be cancelled cooperatively.
+
+    The function receives the job itself and should call check() between
+    expensive steps, so that stale work is abandoned as early as possible.
+    on_cancel is called instead of callback if the job was cancelled or
+    failed.
+    """
+
+    def __init__(self, func, callback=None, on_cancel=None):
+        self.func = func
+        self.callback = callback
+        self.on_cancel = on_cancel
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def run(self):
+        try:
+            result = self.func(self)
+            self.check()
+        except Cancelled:
+            if self.on_cancel is not None:
+                self.on_cancel()
+            return
+        except Exception:
+            traceback.print_exc()
+            # Whoever waits for the result still has to be let go.
+            if self.on_cancel is not None:
+                self.on_cancel()
+            return
+        if self.callback is not None:
+            self.callback(result)
+
+
+class Worker(object):
+    """Run jobs on a single daemon thread, newest job per key wins.
+
+    Submitting a job cancels the pending or running job of the same key,
+    e.g. the completions for the previous keystroke in the same view.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = collections.OrderedDict()
+        self.running = {}
+        self.thread = None
+        self.stopped = False
+
+    def submit(self, key, func, callback=None, on_cancel=None):
+        job = Job(func, callback, on_cancel)
+        with self.condition:
+            self._cancel(key)
+            self.pending[key] = job
+            self.stopped = False
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        return job
+
+    def cancel(self, key):
+        with self.condition:
+            self._cancel(key)
+
+    def _cancel(self, key):
+        pending = self.pending.pop(key, None)
+        if pending is not None:
+            pending.cancel()
+            if pending.on_cancel is not None:
+                pending.on_cancel()
+        running = self.running.get(key)
+        if running is not None:
+            running.cancel()
+
+    def shutdown(self):
+        with self.condition:
+            for key in list(self.pending):
+                self._cancel(key)
+            for job in self.running.values():
+                job.cancel()
+            self.stopped = True
+            self.condition.notify()
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                key, job = self.pending.popitem(last=False)
+                self.running[key] = job
+            try:
+                job.run()
+            finally:
+                with self.condition:
+                    if self.running.get(key) is job:
+                        del self.running[key]
+
+
+worker = Worker()
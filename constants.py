@@ -9,17 +9,65 @@ ONLINE_MAXSCRIPT_HELP_URL = {
     "2016": r"http://help.autodesk.com/view/3DSMAX/2016/ENU/index.html",
     "2017": r"http://help.autodesk.com/view/3DSMAX/2017/ENU/index.html",
     "2018": r"http://help.autodesk.com/view/3DSMAX/2018/ENU/index.html",
-    "2018": r"http://help.autodesk.com/view/3DSMAX/2019/ENU/index.html",
+    "2019": r"http://help.autodesk.com/view/3DSMAX/2019/ENU/index.html",
 }
 
 APIPATH = os.path.dirname(os.path.realpath(__file__)) + "\maxscript.api"
 
-# Create the tempfile in "Installed Packages".
-TEMPFILE = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
-    "send_to_3ds_max_temp.ms")
+# Optional API definitions for a specific 3ds Max version, placed next
+# to maxscript.api which is used when there is none for a version.
+VERSIONED_API_FILENAME = "maxscript-{version}.api"
+
+# Optional docs next to an API file, e.g. maxscript.docs, with lines of
+# 'symbol<TAB>signature<TAB>description'.
+DOCS_EXTENSION = ".docs"
+
+SETTINGS_FILENAME = "Sublime3dsMax.sublime-settings"
+
+# Folder below sublime.cache_path() for our persisted caches.
+CACHE_DIRNAME = "Sublime3dsMax"
+CACHE_SUFFIX = ".cache"
+DOCS_INDEX_SUFFIX = ".docs.idx"
+SYMBOLS_CACHE_SUFFIX = ".symbols"
+
+# Threads parsing scripts when indexing the open folders.
+INDEX_WORKERS = 4
+
+# Create the tempfiles in "Installed Packages". They are named after a
+# hash of their content, only the TEMPFILE_COUNT latest ones are kept.
+TEMPDIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+TEMPFILE_PREFIX = "send_to_3ds_max_temp_"
+TEMPFILE_COUNT = 32
+# The single tempfile of earlier versions, deleted if still around.
+LEGACY_TEMPFILES = ("send_to_3ds_max_temp.ms",)
+
+# Selections larger than this many characters are written to their
+# tempfile piecewise, STREAM_CHUNK characters at a time.
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK = 256 * 1024
 
 TITLE_IDENTIFIER = "Autodesk 3ds Max"
+
+# Window classes of the 3ds Max main window: '3DSMAX' up to 2016, Qt
+# based names like 'Qt5QWindowIcon' since 2017. Matched as substrings.
+MAX_WINDOW_CLASSES = ("3DSMAX", "QWindowIcon")
+MAX_PROCESS_NAMES = ("3dsmax.exe",)
+
+# Seconds until the list of found 3ds Max instances is refreshed.
+DISCOVERY_TTL = 5.0
+
+# Ports probed for listener servers when looking for all instances, each
+# 3ds Max takes the next free one, see max/sublime3dsmax_listener.py.
+SOCKET_PORT_RANGE = 10
+
+# Maximum number of 3ds Max instances sent to at once when broadcasting.
+BROADCAST_WORKERS = 8
+
+# Name of the output panel showing the MAXScript Listener output.
+OUTPUT_PANEL = "3dsmax"
+
+# Maximum number of sends waiting to be delivered to 3ds Max.
+SEND_QUEUE_SIZE = 16
 PREFIX = "Sublime3dsMax:"
 NO_SUPPORTED_FILE = (PREFIX + " File type not supported, must be of: "
                      "*.ms, *.mcr, *.mcr, *.mse, *.py")
@@ -27,3 +75,12 @@ NO_TEMP = PREFIX + " Could not write to temp file"
 NOT_SAVED = PREFIX + " File must be saved before sending to 3ds Max"
 MAX_NOT_FOUND = PREFIX + " Could not find a 3ds max instance."
 RECORDER_NOT_FOUND = PREFIX + " Could not find MAXScript Macro Recorder"
+NO_BROADCAST_TARGETS = (PREFIX + " No 3ds Max instances to broadcast to, "
+                        "check some with 'Select 3ds Max Instances'")
+NO_TESTS = PREFIX + " No MAXScript test scripts (*.ms) found in that folder"
+NO_CHANGES = PREFIX + " No definitions changed since the last send"
+NO_STALE_FILES = PREFIX + " No changed files to send"
+NO_DEFINITION = PREFIX + " No definition found"
+QUEUE_FULL = PREFIX + " Too many sends waiting for 3ds Max, dropped this one"
+SELECTION_CHANGED = (PREFIX + " The file changed before the selection "
+                     "could be sent, please send it again")
@@ -0,0 +1,161 @@
+"""Discovery of running 3ds Max instances."""
+from __future__ import unicode_literals
+
+import ntpath
+import re
+import threading
+import time
+
+from . import constants
+from . import winapi
+
+
+def parse_max_version(window_text):
+    """Return the 3ds Max version mentioned in a window title or None."""
+    matches = re.findall(r"(?:Max )(2\d{3})", window_text or "")
+    if matches:
+        return matches[-1]
+    return None
+
+
+class MaxInstance(object):
+    """A 3ds Max main window along with its title and version."""
+
+    def __init__(self, window, title, version):
+        self.window = window
+        self.title = title
+        self.version = version
+
+
+def _get_alive(instances):
+    """Return the instances whose window still exists."""
+    return [instance for instance in instances if instance.window.is_valid()]
+
+
+class Discovery(object):
+    """Find 3ds Max main windows without reading every title on the desktop.
+
+    Top-level windows are filtered by class name first, then by the
+    executable of their process, and only the remaining ones have their
+    title fetched. Only if that finds nothing, e.g. because a new 3ds Max
+    version uses another window class, all windows of 3ds Max processes
+    are checked. The result is kept for a few seconds and refreshed in
+    the background once it got stale.
+    """
+
+    def __init__(self, ttl=constants.DISCOVERY_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.instances = None
+        self.timestamp = 0
+        self.refreshing = False
+        # Called with the instances once the running refresh is done.
+        self.callbacks = []
+
+    def _is_max_process(self, window, images):
+        try:
+            pid = window.get_process_id()
+        except (OSError, ValueError):
+            return False
+        if pid not in images:
+            image = winapi.get_backend().get_process_image_name(pid)
+            images[pid] = image and ntpath.basename(image).lower()
+        image = images[pid]
+        # Processes we may not query are not ruled out, the title decides.
+        return image is None or image in constants.MAX_PROCESS_NAMES
+
+    def _get_instance(self, window):
+        title = window.get_text()
+        if title is None or constants.TITLE_IDENTIFIER not in title:
+            return None
+        return MaxInstance(window, title, parse_max_version(title))
+
+    def scan(self):
+        """Search the desktop for 3ds Max windows, bypassing the cache."""
+        windows = winapi.Window.list_windows()
+        images = {}
+        instances = []
+        for window in windows:
+            try:
+                classname = window.get_classname()
+            except OSError:
+                continue
+            if not any(pattern in classname
+                       for pattern in constants.MAX_WINDOW_CLASSES):
+                continue
+            if not self._is_max_process(window, images):
+                continue
+            instance = self._get_instance(window)
+            if instance is not None:
+                instances.append(instance)
+
+        if not instances:
+            for window in windows:
+                if not self._is_max_process(window, images):
+                    continue
+                instance = self._get_instance(window)
+                if instance is not None:
+                    instances.append(instance)
+        return instances
+
+    def refresh(self):
+        instances = self.scan()
+        with self.lock:
+            self.instances = instances
+            self.timestamp = time.time()
+            self.refreshing = False
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(_get_alive(instances))
+        return instances
+
+    def refresh_async(self, on_done=None):
+        """Scan in the background, then call on_done with the instances.
+
+        on_done is called on the scanning thread.
+        """
+        with self.lock:
+            if on_done is not None:
+                self.callbacks.append(on_done)
+            if self.refreshing:
+                return
+            self.refreshing = True
+        thread = threading.Thread(target=self.refresh)
+        thread.daemon = True
+        thread.start()
+
+    def get_instances(self, wait=False):
+        """Return the known 3ds Max instances whose window still exists.
+
+        A stale result is returned as is while it is refreshed in the
+        background, unless wait is given, e.g. when about to send to an
+        instance that may just have been started.
+        """
+        with self.lock:
+            instances = self.instances
+            age = time.time() - self.timestamp
+        if instances is None or (wait and age > self.ttl):
+            instances = self.refresh()
+        elif age > self.ttl:
+            self.refresh_async()
+        return _get_alive(instances)
+
+    def get_cached_instances(self):
+        """Return the instances found so far without scanning or None."""
+        with self.lock:
+            instances = self.instances
+        if instances is None:
+            return None
+        return _get_alive(instances)
+
+    def find_instance(self, wait=False):
+        """Return the first known 3ds Max instance or None."""
+        instances = self.get_instances(wait)
+        return instances[0] if instances else None
+
+    def invalidate(self):
+        with self.lock:
+            self.instances = None
+
+
+discovery = Discovery()
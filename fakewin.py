@@ -0,0 +1,265 @@
+"""A simulated Win32 desktop, to run and measure the plugin off Windows.
+
+FakeDesktop implements the methods of winapi.Win32Backend on a tree of
+fake windows. It can hold any number of 3ds Max instances next to
+unrelated windows, records every message sent and can delay each one
+to mimic a busy 3ds Max:
+
+    desktop = fakewin.FakeDesktop(latency=0.01)
+    desktop.add_noise(2000)
+    desktop.add_max("2019")
+    winapi.set_backend(desktop)
+
+Typing a line into a mini macrorecorder and pressing return appends
+the result of evaluate(line), by default the line itself, to the
+Listener output next to it, which can be read with SCI_GETTEXTRANGE.
+"""
+from __future__ import unicode_literals
+
+import itertools
+import threading
+import time
+
+from . import winapi
+
+
+MAX_IMAGE = "C:\\Program Files\\Autodesk\\3ds Max {0}\\3dsmax.exe"
+MAX_TITLE = "Untitled - Autodesk 3ds Max {0}"
+
+NOISE = [("Chrome_WidgetWin_1", "chrome.exe", "New Tab - Google Chrome"),
+         ("Notepad", "notepad.exe", "Untitled - Notepad"),
+         ("CabinetWClass", "explorer.exe", "Documents"),
+         ("PX_WINDOW_CLASS", "sublime_text.exe", "untitled - Sublime Text")]
+
+
+class FakeWindow(object):
+    """A window of the simulated desktop."""
+
+    def __init__(self, handle, classname, text, parent, pid):
+        self.handle = handle
+        self.classname = classname
+        self.text = text
+        self.parent = parent
+        self.pid = pid
+        self.children = []
+        self.messages = []
+        # Scintilla document, the Listener output for MXS_Scintilla.
+        self.document = bytearray()
+        # Where evaluated lines go, set for mini macrorecorders.
+        self.output = None
+
+
+class FakeMemory(object):
+    """Memory "allocated in another process", see winapi.RemoteMemory."""
+
+    def __init__(self, desktop, address, size):
+        self.desktop = desktop
+        self.address = address
+        self.size = size
+
+    def write(self, data, offset=0):
+        buf = self.desktop.memory[self.address]
+        buf[offset:offset + len(data)] = data
+
+    def read(self, size, offset=0):
+        return bytes(self.desktop.memory[self.address][offset:offset + size])
+
+    def free(self):
+        self.desktop.memory.pop(self.address, None)
+
+
+class FakeDesktop(object):
+    """Simulated top-level windows, their children and processes."""
+
+    def __init__(self, latency=0.0, evaluate=None):
+        self.latency = latency
+        self.evaluate = evaluate
+        self.lock = threading.RLock()
+        self.windows = {}
+        self.toplevel = []
+        self.images = {}
+        self.memory = {}
+        self._handles = itertools.count(0x10010, 4)
+        self._pids = itertools.count(1000, 4)
+        self._addresses = itertools.count(0x10000000, 0x1000000)
+
+    # -- building the desktop ---------------------------------------------
+
+    def add_process(self, image):
+        pid = next(self._pids)
+        self.images[pid] = image
+        return pid
+
+    def add_window(self, classname, text="", parent=None, pid=None):
+        with self.lock:
+            if parent is not None and pid is None:
+                pid = parent.pid
+            window = FakeWindow(next(self._handles), classname, text, parent,
+                                pid)
+            self.windows[window.handle] = window
+            if parent is None:
+                self.toplevel.append(window)
+            else:
+                parent.children.append(window)
+            return window
+
+    def add_max(self, version="2019", legacy=False, toolbars=20):
+        """Add a 3ds Max main window along with its mini listener.
+
+        legacy builds a 3ds Max 9 like window, whose mini macrorecorder
+        is a RICHEDIT control instead of Scintilla.
+        """
+        pid = self.add_process(MAX_IMAGE.format(version))
+        main = self.add_window("3DSMAX" if legacy else "Qt5QWindowIcon",
+                               MAX_TITLE.format(version), pid=pid)
+        for index in range(toolbars):
+            toolbar = self.add_window("ToolbarWindow32", parent=main)
+            self.add_window("Button", "Button {0}".format(index),
+                            parent=toolbar)
+        status = self.add_window("StatusPanel", parent=main)
+        if legacy:
+            recorder = self.add_window("RICHEDIT", parent=status)
+        else:
+            recorder = self.add_window("MXS_Scintilla", parent=status)
+            recorder.output = self.add_window("MXS_Scintilla", parent=status)
+            # The macro recorder pane of the Listener window, which is
+            # usually longer than the output but must not be taken for it.
+            listener = self.add_window("MAXScriptListener", parent=main)
+            pane = self.add_window("MXS_Scintilla", parent=listener)
+            pane.document.extend(b"-- recorded action\n" * 1000)
+        return main
+
+    def add_noise(self, count, children=3):
+        """Add count unrelated top-level windows with a few children."""
+        for index in range(count):
+            classname, image, title = NOISE[index % len(NOISE)]
+            window = self.add_window(classname, title,
+                                     pid=self.add_process(image))
+            for _ in range(children):
+                self.add_window("Static", parent=window)
+
+    def close(self, window):
+        """Destroy window and all its children."""
+        with self.lock:
+            if window.parent is None:
+                self.toplevel.remove(window)
+            else:
+                window.parent.children.remove(window)
+            stack = [window]
+            while stack:
+                current = stack.pop()
+                self.windows.pop(current.handle, None)
+                stack.extend(current.children)
+
+    def find_recorder(self, main):
+        for window in self._descendants(main):
+            if window.classname in ("MXS_Scintilla", "RICHEDIT"):
+                return window
+        return None
+
+    # -- backend interface, see winapi.Win32Backend ------------------------
+
+    def _get(self, hWnd):
+        window = self.windows.get(hWnd)
+        if window is None:
+            raise OSError("Invalid window handle")
+        return window
+
+    def _descendants(self, window):
+        stack = list(reversed(window.children))
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(current.children))
+
+    def enum_windows(self):
+        with self.lock:
+            return [window.handle for window in self.toplevel]
+
+    def enum_child_windows(self, hWnd):
+        with self.lock:
+            return [window.handle
+                    for window in self._descendants(self._get(hWnd))]
+
+    def get_class_name(self, hWnd):
+        return self._get(hWnd).classname
+
+    def get_window_text(self, hWnd):
+        window = self.windows.get(hWnd)
+        if window is None:
+            return None
+        return window.text or None
+
+    def get_window_thread_process_id(self, hWnd):
+        return self._get(hWnd).pid
+
+    def get_process_image_name(self, dwProcessId):
+        return self.images.get(dwProcessId)
+
+    def is_window(self, hWnd):
+        return hWnd in self.windows
+
+    def is_child(self, hWndParent, hWnd):
+        window = self.windows.get(hWnd)
+        while window is not None:
+            window = window.parent
+            if window is not None and window.handle == hWndParent:
+                return True
+        return False
+
+    def get_parent(self, hWnd):
+        parent = self._get(hWnd).parent
+        return parent.handle if parent is not None else None
+
+    def send_message(self, hWnd, uMsg, wParam=None, lParam=None):
+        window = self._get(hWnd)
+        with self.lock:
+            window.messages.append((uMsg, wParam, lParam))
+        if self.latency:
+            time.sleep(self.latency)
+        return self._handle(window, uMsg, wParam, lParam)
+
+    def open_memory(self, dwProcessId, size):
+        with self.lock:
+            address = next(self._addresses)
+            self.memory[address] = bytearray(size)
+        return FakeMemory(self, address, size)
+
+    # -- message handling ----------------------------------------------------
+
+    def _handle(self, window, uMsg, wParam, lParam):
+        if uMsg == winapi.WM_SETTEXT:
+            if isinstance(lParam, bytes):
+                lParam = lParam.decode("utf-8")
+            window.text = lParam or ""
+            return 1
+        if uMsg == winapi.WM_CHAR and wParam == winapi.VK_RETURN:
+            if window.output is not None:
+                line = window.text.rstrip("\r\n")
+                result = self.evaluate(line) if self.evaluate else line
+                with self.lock:
+                    window.output.document.extend(
+                        "{0}\n".format(result).encode("utf-8"))
+            return 0
+        if uMsg == winapi.SCI_GETLENGTH:
+            return len(window.document)
+        if uMsg == winapi.SCI_GETTEXTRANGE:
+            return self._get_text_range(window, lParam)
+        return 0
+
+    def _locate(self, address):
+        for base, buf in self.memory.items():
+            if base <= address < base + len(buf):
+                return buf, address - base
+        raise OSError("Invalid address")
+
+    def _get_text_range(self, window, address):
+        buf, offset = self._locate(address)
+        size = winapi.sizeof(winapi.Sci_TextRange)
+        textrange = winapi.Sci_TextRange.from_buffer_copy(
+            bytes(buf[offset:offset + size]))
+        with self.lock:
+            text = bytes(window.document[textrange.cpMin:textrange.cpMax])
+        target, target_offset = self._locate(textrange.lpstrText)
+        target[target_offset:target_offset + len(text) + 1] = text + b"\0"
+        return len(text)
@@ -1,58 +1,113 @@
-"""Filtering for auto-completion."""
-
-import sublime
-
-
-class _BaseFilter(object):
-    """Subclass this."""
-
-    def filter(self, view, prefix, locations, completions):
-        pass
-
-
-class DotFilter(_BaseFilter):
-    """Provide matching completions when typing a `.` after a keyword."""
-
-    def dotfilter(self, view):
-        dot = view.substr(sublime.Region(view.sel()[0].a - 1,
-                                         view.sel()[0].b))
-        is_dot = ord(dot[0]) == 46
-        return is_dot
-
-    def filter(self, view, prefix, locations, completions):
-        if self.dotfilter(view):
-            completions_list_filter = []
-            wordstart = view.word(
-                sublime.Region(view.sel()[0].a - 1, view.sel()[0].b)).a
-            prefix = view.substr(sublime.Region(wordstart, view.sel()[0].b))
-            for c in completions:
-                try:
-                    if len(prefix) > 0:
-                        if prefix.lower() in c[0].lower()[0:len(prefix)]:
-                            completions_list_filter.append((c[0], c[1]))
-                except UnicodeDecodeError:
-                    continue
-            return completions_list_filter
-
-
-class FilterManager(object):
-    """Store multiple filter for usage from outside."""
-
-    filters = []
-
-    def add_filter(self, cfilter, index=None):
-        if index is None:
-            self.filters.append(cfilter)
-        else:
-            self.filters.insert(index, cfilter)
-
-    def apply_filters(self, view, prefix, locations, completions):
-        for f in self.filters:
-            filtered = f.filter(view, prefix, locations, completions)
-            if filtered is not None:
-                completions = filtered
-        return completions
-
-
-manager = FilterManager()
-manager.add_filter(DotFilter())
+"""Filtering for auto-completion."""
+
+import re
+
+import sublime
+
+
+# Matches the (possibly dotted) identifier right before the cursor.
+QUERY_RE = re.compile(r"[\w.]*$")
+
+
+def get_completion_query(view, location):
+    """Return the dotted identifier in front of location, e.g. 'polyOp.get'.
+
+    Sublime only passes the part after the last dot as prefix, but to
+    look up namespaced API entries we need the full dotted word.
+    """
+    linestart = view.line(location).a
+    start = max(linestart, location - 256)
+    text = view.substr(sublime.Region(start, location))
+    return QUERY_RE.search(text).group(0)
+
+
+def is_namespace_query(query):
+    """Return if query completes a member of an API namespace.
+
+    That is 'polyop.get' but neither 'get' nor 'myTool.do', whose
+    receiver may be any variable of the script.
+    """
+    index = manager.namespace_index
+    namespace = query.rpartition(".")[0]
+    return bool(namespace) and index is not None and namespace in index
+
+
+class _BaseFilter(object):
+    """Subclass this."""
+
+    def get_namespace_index(self):
+        """Return the shared apiindex.NamespaceIndex, if already built."""
+        return manager.namespace_index
+
+    def filter(self, view, prefix, locations, completions):
+        pass
+
+
+class DotFilter(_BaseFilter):
+    """Provide matching completions when typing a `.` after a keyword."""
+
+    def dotfilter(self, view):
+        dot = view.substr(sublime.Region(view.sel()[0].a - 1,
+                                         view.sel()[0].b))
+        is_dot = ord(dot[0]) == 46
+        return is_dot
+
+    def filter(self, view, prefix, locations, completions):
+        index = self.get_namespace_index()
+        if index is None:
+            return self.scan(view, completions)
+
+        # Only narrow down by the first letter of the member, anything
+        # finer is left to the ranking which also allows fuzzy matches.
+        query = get_completion_query(view, locations[0])
+        if is_namespace_query(query):
+            namespace, _, member = query.rpartition(".")
+            return [(name, name)
+                    for name in index.find(namespace, member[:1])]
+
+    def scan(self, view, completions):
+        """Linear fallback used until the namespace index is available."""
+        if self.dotfilter(view):
+            completions_list_filter = []
+            wordstart = view.word(
+                sublime.Region(view.sel()[0].a - 1, view.sel()[0].b)).a
+            prefix = view.substr(sublime.Region(wordstart, view.sel()[0].b))
+            for c in completions:
+                try:
+                    if len(prefix) > 0:
+                        if prefix.lower() in c[0].lower()[0:len(prefix)]:
+                            completions_list_filter.append((c[0], c[1]))
+                except UnicodeDecodeError:
+                    continue
+            return completions_list_filter
+
+
+class FilterManager(object):
+    """Store multiple filter for usage from outside.
+
+    The namespace_index is shared by all filters, so that plugins which
+    register through add_filter() can reuse it instead of rescanning.
+    """
+
+    filters = []
+    namespace_index = None
+
+    def add_filter(self, cfilter, index=None):
+        if index is None:
+            self.filters.append(cfilter)
+        else:
+            self.filters.insert(index, cfilter)
+
+    def set_namespace_index(self, namespace_index):
+        self.namespace_index = namespace_index
+
+    def apply_filters(self, view, prefix, locations, completions):
+        for f in self.filters:
+            filtered = f.filter(view, prefix, locations, completions)
+            if filtered is not None:
+                completions = filtered
+        return completions
+
+
+manager = FilterManager()
+manager.add_filter(DotFilter())
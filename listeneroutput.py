@@ -0,0 +1,144 @@
+"""Streaming of MAXScript Listener output back to Sublime."""
+from __future__ import unicode_literals
+
+import codecs
+import threading
+import time
+
+
+# Bytes read from the Listener per SCI_GETTEXTRANGE call.
+CHUNK = 64 * 1024
+
+
+def find_listener_output(recorder):
+    """Return the Scintilla control showing the Listener output or None.
+
+    3ds Max has several MXS_Scintilla controls besides the mini
+    macrorecorder we type into, like the macro recorder pane of the
+    Listener window. The output is the one next to the macrorecorder,
+    in the same StatusPanel or Listener window.
+    """
+    parent = recorder.get_parent()
+    if parent is None:
+        return None
+    handle = parent.get_handle()
+    for control in parent.find_children("MXS_Scintilla"):
+        if control.get_handle() == recorder.get_handle():
+            continue
+        sibling = control.get_parent()
+        if sibling is not None and sibling.get_handle() == handle:
+            return control
+    return None
+
+
+class ScintillaTail(object):
+    """Read the text appended to a Scintilla control of another process.
+
+    Only the text after the last read position is fetched, using
+    SCI_GETTEXTRANGE on a buffer allocated in the other process, so a
+    Listener holding megabytes of output costs nothing per poll. Output
+    that is already there when the tail is created is skipped.
+    """
+
+    def __init__(self, control, winapi, chunk=CHUNK):
+        self.control = control
+        self.winapi = winapi
+        self.chunk = chunk
+        self.memory = None
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.position = self.get_length()
+
+    def get_length(self):
+        return self.control.send(self.winapi.SCI_GETLENGTH, 0, 0) or 0
+
+    def _get_memory(self, size):
+        if self.memory is None or self.memory.size < size:
+            if self.memory is not None:
+                self.memory.free()
+            self.memory = None
+            self.memory = self.winapi.get_backend().open_memory(
+                self.control.get_process_id(), size)
+        return self.memory
+
+    def _read_range(self, start, end):
+        header = self.winapi.sizeof(self.winapi.Sci_TextRange)
+        # Scintilla writes a terminating NUL behind the text.
+        memory = self._get_memory(header + self.chunk + 1)
+        textrange = self.winapi.Sci_TextRange(start, end,
+                                              memory.address + header)
+        memory.write(bytes(bytearray(textrange)))
+        self.control.send(self.winapi.SCI_GETTEXTRANGE, 0, memory.address)
+        return memory.read(end - start, header)
+
+    def read(self):
+        """Return the text appended since the last read."""
+        length = self.get_length()
+        if length < self.position:
+            # The Listener has been cleared.
+            self.position = 0
+            self.decoder.reset()
+        parts = []
+        while self.position < length:
+            end = min(length, self.position + self.chunk)
+            parts.append(self.decoder.decode(
+                self._read_range(self.position, end)))
+            self.position = end
+        return "".join(parts)
+
+    def close(self):
+        if self.memory is not None:
+            self.memory.free()
+            self.memory = None
+
+
+class TailPoller(object):
+    """Poll a tail on a daemon thread while output is to be expected.
+
+    watch() is called whenever something was sent. Polling continues
+    until nothing new arrived for linger seconds, so an idle 3ds Max is
+    not polled at all. New text is passed to on_output.
+    """
+
+    def __init__(self, on_output, interval=0.1, linger=3.0):
+        self.on_output = on_output
+        self.interval = interval
+        self.linger = linger
+        self.lock = threading.Lock()
+        self.tail = None
+        self.deadline = 0
+        self.thread = None
+
+    def watch(self, tail):
+        with self.lock:
+            self.tail = tail
+            self.deadline = time.time() + self.linger
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def _loop(self):
+        while True:
+            with self.lock:
+                if self.tail is None or time.time() > self.deadline:
+                    self.thread = None
+                    return
+                tail = self.tail
+            try:
+                text = tail.read()
+            except (OSError, ValueError):
+                # 3ds Max has been closed, stop until the next send.
+                with self.lock:
+                    if self.tail is tail:
+                        self.tail = None
+                continue
+            if text:
+                self.on_output(text)
+                with self.lock:
+                    self.deadline = max(self.deadline,
+                                        time.time() + self.linger)
+            time.sleep(self.interval)
+
+    def stop(self):
+        with self.lock:
+            self.tail = None
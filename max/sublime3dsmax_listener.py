@@ -0,0 +1,222 @@
+"""Listener server for Sublime3dsMax, running inside 3ds Max.
+
+Lets Sublime send code over a localhost TCP connection instead of
+typing it into the mini macrorecorder. Put this file into one of the
+startup script folders of 3ds Max (2017 or newer), e.g.
+
+    C:\\Program Files\\Autodesk\\3ds Max 2019\\scripts\\startup
+
+or run it manually from the MAXScript Listener:
+
+    python.executeFile @"C:\\path\\to\\sublime3dsmax_listener.py"
+
+and set "transport": "socket" in Sublime3dsMax.sublime-settings.
+
+Each message is a 4 byte big-endian length followed by that many bytes
+of utf-8 JSON. Requests look like {"language": "maxscript", "code": ...}
+and are answered with {"ok": true/false, "result": ..., "output": ...}.
+
+The server binds the first free port starting at PORT, so that several
+3ds Max instances on one machine each get their own. Code is evaluated
+on the main thread of 3ds Max via a Qt timer. Without 3ds Max (e.g. in
+a stand-in for testing) an evaluate function can be passed to
+ListenerServer and is called on the connection thread.
+
+Compatible with both Python 2.7 (3ds Max 2017-2020) and Python 3.
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import traceback
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+try:
+    from io import StringIO
+except ImportError:  # Python 2
+    from StringIO import StringIO
+
+
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("SUBLIME3DSMAX_PORT", 27100))
+PORT_RANGE = 10
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 256 * 1024 * 1024
+
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise EOFError("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    if size > MAX_FRAME:
+        raise ValueError("Frame too large: {0}".format(size))
+    return json.loads(recv_exactly(sock, size).decode("utf-8"))
+
+
+def send_frame(sock, message):
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def evaluate_in_max(language, code):
+    """Evaluate code with 3ds Max, return (result, output)."""
+    if language == "python":
+        return evaluate_python(code, {"__name__": "__main__"})
+    import pymxs
+    return "{0}".format(pymxs.runtime.execute(code)), ""
+
+
+def evaluate_python(code, namespace):
+    """Run Python code, return (None, captured stdout)."""
+    output = StringIO()
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        exec(compile(code, "<sublime>", "exec"), namespace)
+    finally:
+        sys.stdout = stdout
+    return None, output.getvalue()
+
+
+class MainThreadDispatcher(object):
+    """Run callables on the Qt main thread of 3ds Max."""
+
+    def __init__(self, interval=20):
+        try:
+            from PySide2 import QtCore
+        except ImportError:
+            from PySide import QtCore
+        self.calls = queue.Queue()
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self._drain)
+        self.timer.start(interval)
+
+    def _drain(self):
+        while True:
+            try:
+                func, done = self.calls.get_nowait()
+            except queue.Empty:
+                return
+            func()
+            done.set()
+
+    def call(self, func):
+        done = threading.Event()
+        self.calls.put((func, done))
+        done.wait()
+
+    def stop(self):
+        self.timer.stop()
+
+
+class ListenerServer(object):
+    """Accept connections and evaluate the code they send."""
+
+    def __init__(self, evaluate=None, dispatcher=None, host=HOST, port=PORT,
+                 port_range=PORT_RANGE):
+        self.evaluate = evaluate or evaluate_in_max
+        self.dispatcher = dispatcher
+        self.sock = self._bind(host, port, port_range)
+        self.host, self.port = self.sock.getsockname()[:2]
+        self.thread = None
+        self.running = False
+
+    def _bind(self, host, port, port_range):
+        error = None
+        for candidate in range(port, port + port_range):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.bind((host, candidate))
+            except socket.error as e:
+                sock.close()
+                error = e
+                continue
+            sock.listen(5)
+            return sock
+        raise error
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._accept)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except socket.error:
+            pass
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
+    def _accept(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except (socket.error, OSError):
+                return
+            thread = threading.Thread(target=self._serve, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                try:
+                    request = recv_frame(conn)
+                except (EOFError, socket.error):
+                    return
+                send_frame(conn, self.handle(request))
+        finally:
+            conn.close()
+
+    def handle(self, request):
+        language = request.get("language", "maxscript")
+        code = request.get("code", "")
+        reply = {}
+
+        def run():
+            try:
+                result, output = self.evaluate(language, code)
+                reply.update(ok=True, result=result, output=output)
+            except Exception:
+                reply.update(ok=False, result=None,
+                             output=traceback.format_exc())
+
+        if self.dispatcher is not None:
+            self.dispatcher.call(run)
+        else:
+            run()
+        return reply
+
+
+def main():
+    server = ListenerServer(dispatcher=MainThreadDispatcher()).start()
+    # Keep a reference so the server is not garbage collected.
+    sys.modules[__name__].server = server
+    print("Sublime3dsMax listener on {0}:{1}".format(server.host, server.port))
+    return server
+
+
+if __name__ == "__main__":
+    server = main()
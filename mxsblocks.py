@@ -0,0 +1,230 @@
+"""Top-level definitions of MAXScript files and what changed in them.
+
+A file is split into top-level statements by tracking parentheses,
+strings and comments. A statement continues onto the next line when a
+line ends in '=' or another operator, when the next line starts with a
+keyword like 'else' or 'catch', and inside definitions as long as the
+lines are indented:
+
+    fn sign x =
+        if x < 0 then -1
+        else 1
+
+Statements starting with fn, struct, rollout, macroScript, utility or
+plugin are definitions, everything else is other code.
+"""
+from __future__ import unicode_literals
+
+import os
+import re
+import threading
+
+
+DEFINITION_RE = re.compile(
+    r"(?:mapped\s+)?(fn|function)\s+(\w+)"
+    r"|(struct|rollout|macroScript|utility)\s+(\w+)"
+    r"|(plugin)\s+\w+\s+(\w+)", re.I)
+
+# Line endings that make a statement continue on the next line.
+CONTINUATION_CHARS = "=,+-*/\\("
+CONTINUATION_WORDS = frozenset(["do", "then", "else", "of", "in", "and",
+                                "or", "collect", "where", "to", "by"])
+
+# Line starts that continue the statement of the previous line.
+LEADING_CHARS = ")+*/=,"
+LEADING_WORDS = frozenset(["do", "then", "else", "catch", "of", "in", "and",
+                           "or", "collect", "where", "to", "by"])
+
+CODE, STRING, VERBATIM, COMMENT = range(4)
+
+# What ends the current lexer state, searched for instead of looking at
+# every character.
+CODE_END_RE = re.compile(r'--|/\*|@?"')
+STRING_BODY_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*')
+
+
+def scan_lines(text, keep_strings=False):
+    """Yield (depth, state, code) for each line of MAXScript text.
+
+    depth and state are the parenthesis depth and the lexer state at
+    the start of the line, code is the line without comments and with
+    string contents removed, unless keep_strings is given.
+    """
+    depth = 0
+    state = CODE
+    for line in text.split("\n"):
+        start_depth, start_state = depth, state
+        if state == CODE and '"' not in line and "--" not in line and \
+                "/*" not in line:
+            # Most lines are plain code, take a shortcut for them.
+            depth = max(0, depth + line.count("(") - line.count(")"))
+            yield start_depth, start_state, line.strip()
+            continue
+        code = []
+        position, length = 0, len(line)
+        while position < length:
+            if state == CODE:
+                match = CODE_END_RE.search(line, position)
+                end = match.start() if match else length
+                chunk = line[position:end]
+                code.append(chunk)
+                depth = max(0, depth + chunk.count("(") - chunk.count(")"))
+                if match is None or match.group() == "--":
+                    break
+                if match.group() == "/*":
+                    state = COMMENT
+                else:
+                    state = VERBATIM if match.group() == '@"' else STRING
+                    code.append(match.group() if keep_strings else '"')
+                position = match.end()
+            elif state == COMMENT:
+                end = line.find("*/", position)
+                if end == -1:
+                    break
+                state = CODE
+                position = end + 2
+            else:
+                if state == STRING:
+                    end = STRING_BODY_RE.match(line, position).end()
+                else:
+                    end = line.find('"', position)
+                    end = length if end == -1 else end
+                if end >= length or line[end] != '"':
+                    if keep_strings:
+                        code.append(line[position:])
+                    break
+                if keep_strings:
+                    code.append(line[position:end])
+                state = CODE
+                code.append('"')
+                position = end + 1
+        yield start_depth, start_state, "".join(code).strip()
+
+
+class Block(object):
+    """A top-level statement spanning the lines start to end inclusive."""
+
+    def __init__(self, start, end, text, kind=None, name=None,
+                 complete=True):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.kind = kind
+        self.name = name
+        # False if the statement is cut off by the end of the text, e.g.
+        # by an unclosed parenthesis, so where it ends is unknown.
+        self.complete = complete
+
+    @property
+    def key(self):
+        """Identifies a definition, MAXScript names ignore case."""
+        return (self.kind, self.name.lower()) if self.kind else None
+
+
+def _continues(code):
+    """Return if a line of code continues on the next line."""
+    if code[-1] in CONTINUATION_CHARS:
+        return True
+    return code.rsplit(None, 1)[-1].lower() in CONTINUATION_WORDS
+
+
+def _is_continuation(code):
+    """Return if a line of code continues the previous line."""
+    if code[0] in LEADING_CHARS:
+        return True
+    return code.split(None, 1)[0].lower() in LEADING_WORDS
+
+
+def split_blocks(text):
+    """Return the top-level statements of text as Blocks, in order."""
+    lines = text.split("\n")
+    ranges = []
+    continued = False
+    # If the current statement is a definition header still waiting for
+    # its body, as in 'struct Foo' followed by '(' on the next line.
+    header = False
+    definition = False
+    # The extra line tells the lexer state at the end of the text.
+    for index, (depth, state, code) in enumerate(scan_lines(text + "\n")):
+        if index == len(lines):
+            break
+        in_string = state in (STRING, VERBATIM)
+        if header and code.startswith("("):
+            continued = True
+        elif definition and lines[index][:1] in (" ", "\t"):
+            continued = True
+        if depth == 0 and not in_string and code and not continued and \
+                not _is_continuation(code):
+            definition = bool(DEFINITION_RE.match(code))
+            ranges.append([index, index])
+            header = definition and "(" not in code and "=" not in code
+        elif ranges and (code or depth or in_string):
+            ranges[-1][1] = index
+            header = header and not code
+        if code:
+            continued = _continues(code)
+    complete = depth == 0 and state == CODE and not continued and not header
+
+    blocks = []
+    for start, end in ranges:
+        block_text = "\n".join(lines[start:end + 1])
+        match = DEFINITION_RE.match(block_text.lstrip())
+        kind = name = None
+        if match:
+            groups = [group for group in match.groups() if group]
+            kind, name = groups[0].lower(), groups[1]
+            if kind == "function":
+                kind = "fn"
+        blocks.append(Block(start, end, block_text, kind, name))
+    if blocks:
+        blocks[-1].complete = complete
+    return blocks
+
+
+def get_changed_blocks(old_text, new_text):
+    """Return the definitions of new_text that are new or changed.
+
+    Returns None if other top-level code changed as well, as that may
+    depend on anything and only re-evaluating everything is safe. The
+    same goes for a changed definition whose end cannot be told.
+    """
+    old_blocks = split_blocks(old_text)
+    new_blocks = split_blocks(new_text)
+    old_other = [block.text for block in old_blocks if block.kind is None]
+    new_other = [block.text for block in new_blocks if block.kind is None]
+    if old_other != new_other:
+        return None
+    old_definitions = dict((block.key, block.text) for block in old_blocks
+                           if block.kind is not None)
+    changed = [block for block in new_blocks if block.kind is not None and
+               old_definitions.get(block.key) != block.text]
+    if not all(block.complete for block in changed):
+        return None
+    return changed
+
+
+class Snapshots(object):
+    """The text of each file as last sent to 3ds Max."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.texts = {}
+
+    def _key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def get_changed_blocks(self, path, text):
+        """Return the changed definitions, None if unknown or unsafe."""
+        with self.lock:
+            old_text = self.texts.get(self._key(path))
+        if old_text is None:
+            return None
+        return get_changed_blocks(old_text, text)
+
+    def update(self, path, text):
+        with self.lock:
+            self.texts[self._key(path)] = text
+
+    def clear(self):
+        with self.lock:
+            self.texts.clear()
@@ -0,0 +1,235 @@
+"""Dependencies between MAXScript files through fileIn and include.
+
+'fileIn "lib.ms"' loads another script when the statement runs, while
+'include "part.ms"' pastes a file in place when the script is compiled.
+A file together with everything it includes is a unit, units load each
+other with fileIn. Only literal, optionally relative, paths are found:
+
+    fileIn "lib/utils.ms"
+    include @"C:\\tools\\rollout.ms"
+
+Paths built at runtime, as in 'fileIn (getDir #scripts + ...)', are
+ignored.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import re
+import threading
+
+from . import mxsblocks
+
+
+FILEIN = "filein"
+INCLUDE = "include"
+
+STATEMENT_RE = re.compile(
+    r'\b(fileIn|include)\s*(?:@"([^"]*)"|"((?:[^"\\]|\\.)*)")', re.I)
+
+
+def parse_statements(text):
+    """Return (kind, path) of the fileIn/include statements in text.
+
+    Statements inside comments are skipped, paths are returned as
+    written, with escapes of regular strings resolved.
+    """
+    statements = []
+    for _, state, code in mxsblocks.scan_lines(text, keep_strings=True):
+        for match in STATEMENT_RE.finditer(code):
+            kind, verbatim, regular = match.groups()
+            if verbatim is None:
+                regular = re.sub(r"\\(.)", r"\1", regular)
+            statements.append((kind.lower(),
+                               verbatim if verbatim is not None else regular))
+    return statements
+
+
+def _get_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def resolve(path, directory):
+    """Return the absolute path of a fileIn/include or None if missing.
+
+    Relative paths are resolved against the folder of the script.
+    """
+    path = path.replace("\\", os.sep).replace("/", os.sep)
+    path = os.path.normpath(os.path.join(directory, path))
+    return path if os.path.isfile(path) else None
+
+
+class FileInfo(object):
+    """A parsed script, identified by mtime, size and content digest."""
+
+    def __init__(self, mtime, size, digest, statements):
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.statements = statements
+
+
+class Unit(object):
+    """A script to load with fileIn, with the units it loads itself.
+
+    digest covers the script and all files it includes.
+    """
+
+    def __init__(self, path, digest, children):
+        self.path = path
+        self.digest = digest
+        self.children = children
+
+
+class DependencyGraph(object):
+    """The fileIn/include statements of scripts, parsed on demand.
+
+    Files are only read again when their mtime or size changed, and only
+    parsed again when their content did.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+
+    def get_info(self, path):
+        """Return the FileInfo of path or None if it cannot be read."""
+        key = _get_key(path)
+        try:
+            stat = os.stat(path)
+            with self.lock:
+                info = self.files.get(key)
+            if info is not None and \
+                    (info.mtime, info.size) == (stat.st_mtime, stat.st_size):
+                return info
+            with open(path, "rb") as f:
+                content = f.read()
+        except (IOError, OSError):
+            with self.lock:
+                self.files.pop(key, None)
+            return None
+
+        digest = hashlib.sha1(content).hexdigest()
+        if info is not None and info.digest == digest:
+            statements = info.statements
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            statements = []
+            text = content.decode("utf-8", "replace")
+            for kind, target in parse_statements(text):
+                target = resolve(target, directory)
+                if target is not None:
+                    statements.append((kind, target))
+        info = FileInfo(stat.st_mtime, stat.st_size, digest, statements)
+        with self.lock:
+            self.files[key] = info
+        return info
+
+    def _expand(self, path):
+        """Return the digest and the fileIn targets of the unit at path.
+
+        The targets are in the order they run, an included file's
+        fileIns coming where it is included.
+        """
+        digest = hashlib.sha1()
+        fileins = []
+        seen = set()
+        # The statements of the files being included, innermost last.
+        stack = [iter([(INCLUDE, path)])]
+        while stack:
+            kind, target = next(stack[-1], (None, None))
+            if kind is None:
+                stack.pop()
+            elif kind != INCLUDE:
+                fileins.append(target)
+            elif _get_key(target) not in seen:
+                seen.add(_get_key(target))
+                info = self.get_info(target)
+                if info is not None:
+                    digest.update(info.digest.encode("ascii"))
+                    stack.append(iter(info.statements))
+        return digest.hexdigest(), fileins
+
+    def get_load_order(self, root):
+        """Return the Units loaded by root, dependencies first.
+
+        Cyclic fileIns are cut where the cycle closes.
+        """
+        order = []
+        done = set()
+        visiting = set()
+
+        def visit(path):
+            key = _get_key(path)
+            visiting.add(key)
+            digest, fileins = self._expand(path)
+            children = []
+            for target in fileins:
+                target_key = _get_key(target)
+                if target_key in visiting:
+                    continue
+                if target_key not in done:
+                    visit(target)
+                children.append(target_key)
+            visiting.discard(key)
+            done.add(key)
+            order.append(Unit(key, digest, children))
+
+        if self.get_info(root) is not None:
+            visit(root)
+        return order
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+
+
+def get_reloaded(unit, order):
+    """Return the units that sending unit loads, itself included."""
+    units = dict((each.path, each) for each in order)
+    reloaded = []
+    seen = set()
+    stack = [unit.path]
+    while stack:
+        path = stack.pop()
+        if path in seen or path not in units:
+            continue
+        seen.add(path)
+        reloaded.append(units[path])
+        stack.extend(units[path].children)
+    return reloaded
+
+
+class LoadedFiles(object):
+    """The digests of the units last loaded into 3ds Max."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.digests = {}
+
+    def is_loaded(self, unit):
+        with self.lock:
+            return self.digests.get(unit.path) == unit.digest
+
+    def get_stale_units(self, order):
+        """Return the units of order that have to be sent, in order.
+
+        A unit is stale if it changed since it was last loaded. Stale
+        units loaded by another stale unit are left out, sending that one
+        loads them again anyway.
+        """
+        stale = [unit for unit in order if not self.is_loaded(unit)]
+        covered = set()
+        for unit in stale:
+            covered.update(each.path for each in get_reloaded(unit, order)
+                           if each is not unit)
+        return [unit for unit in stale if unit.path not in covered]
+
+    def mark(self, units):
+        with self.lock:
+            for unit in units:
+                self.digests[unit.path] = unit.digest
+
+    def clear(self):
+        with self.lock:
+            self.digests.clear()
@@ -0,0 +1,99 @@
+"""Ranking of auto-completion candidates."""
+from __future__ import unicode_literals
+
+import heapq
+import re
+
+
+# Start of a camel hump: an uppercase letter following a lowercase one
+# or a digit, or any alphanumeric following an underscore.
+HUMP_RE = re.compile(r"(?<=[a-z0-9])[A-Z]|(?<=_)[A-Za-z0-9]")
+
+PREFIX, CAMELHUMP, FUZZY = range(3)
+
+
+def get_seed(query):
+    """Return the part of query that every candidate must start with.
+
+    That is the namespace plus the first letter of the typed member,
+    which still leaves room for camel hump and fuzzy matches.
+    """
+    namespace, dot, member = query.rpartition(".")
+    return namespace + dot + member[:1]
+
+
+def get_initials(word):
+    """Return the camel hump initials of word, 'getVertPos' -> 'gVP'."""
+    if not word:
+        return ""
+    return word[0] + "".join(HUMP_RE.findall(word))
+
+
+def is_subsequence(needle, haystack):
+    chars = iter(haystack)
+    return all(char in chars for char in needle)
+
+
+def match(query, word):
+    """Return the match tier of word for query or None if it does not match.
+
+    Both are compared by their last dotted segment, case-insensitively.
+    """
+    query = query.rpartition(".")[2].lower()
+    word = word.rpartition(".")[2]
+    lowered = word.lower()
+    if lowered.startswith(query):
+        return PREFIX
+    if get_initials(word).lower().startswith(query):
+        return CAMELHUMP
+    if is_subsequence(query, lowered):
+        return FUZZY
+    return None
+
+
+class Ranker(object):
+    """Order completions by match quality and frequency of use.
+
+    Usage counts are recorded whenever a completion is committed, the
+    occurrence counts of the current buffer are passed in per query.
+    """
+
+    def __init__(self):
+        self.usage = {}
+
+    def record_use(self, word):
+        if word:
+            key = word.lower()
+            self.usage[key] = self.usage.get(key, 0) + 1
+
+    def top(self, query, completions, limit, occurrences=None):
+        """Return the best limit completions for query, best first.
+
+        completions are (trigger, contents) tuples as handed to Sublime.
+        Only limit items are kept on a heap, so the ranking cost does not
+        grow with the number of candidates beyond a single pass.
+        """
+        occurrences = occurrences or {}
+        usage = self.usage
+
+        def scored():
+            for completion in completions:
+                trigger = completion[0]
+                tier = match(query, trigger)
+                if tier is None:
+                    continue
+                yield ((tier,
+                        -usage.get(trigger.lower(), 0),
+                        -occurrences.get(trigger, 0),
+                        len(trigger),
+                        trigger.lower()),
+                       completion)
+
+        if limit and limit > 0:
+            best = heapq.nsmallest(limit, scored(), key=lambda item: item[0])
+        else:
+            best = sorted(scored(), key=lambda item: item[0])
+        return [completion for _, completion in best]
+
+
+ranker = Ranker()
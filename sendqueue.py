@@ -0,0 +1,85 @@
+"""Background thread delivering code to 3ds Max."""
+from __future__ import unicode_literals
+
+import collections
+import threading
+import traceback
+
+
+class SendQueue(object):
+    """Run sends on a single daemon thread, in the order they were queued.
+
+    Sending blocks until 3ds Max has evaluated the code, which can take
+    seconds, so the commands only enqueue. A send whose key is already
+    pending, e.g. the same file sent twice in a row, is coalesced into
+    the pending one. At most maxsize sends are pending, further ones are
+    rejected. on_change is called with the number of pending sends and
+    whether one is running whenever that changes.
+    """
+
+    def __init__(self, maxsize, on_change=None):
+        self.maxsize = maxsize
+        self.on_change = on_change
+        self.condition = threading.Condition()
+        self.pending = collections.OrderedDict()
+        self.active = False
+        self.thread = None
+        self.stopped = False
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def put(self, key, func):
+        """Queue func() under key, return False if the queue is full."""
+        with self.condition:
+            if key in self.pending:
+                return True
+            if len(self.pending) >= self.maxsize:
+                return False
+            self.pending[key] = func
+            self.stopped = False
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        self._changed()
+        return True
+
+    def _changed(self):
+        if self.on_change is not None:
+            with self.condition:
+                pending, active = len(self.pending), self.active
+            self.on_change(pending, active)
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                _, func = self.pending.popitem(last=False)
+                self.active = True
+            self._changed()
+            try:
+                func()
+            except Exception:
+                traceback.print_exc()
+            with self.condition:
+                self.active = False
+                self.condition.notify_all()
+            self._changed()
+
+    def wait(self, timeout=None):
+        """Block until all queued sends are done, mostly for testing."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not (self.pending or self.active), timeout)
+
+    def shutdown(self):
+        with self.condition:
+            self.pending.clear()
+            self.stopped = True
+            self.condition.notify_all()
@@ -1,27 +1,52 @@
 """Send maxscript/python files or codelines to 3ds Max.
 
-This is the main sublime plugin file. It currently implements 4 commands
+This is the main sublime plugin file. It currently implements 9 commands
 that you can bind to keys:
 
     - SendFileToMaxCommand aka send_file_to_max
     - SendSelectionToMaxCommand aka send_selection_to_max
+    - SendChangesToMaxCommand aka send_changes_to_max
+    - SendStaleFilesToMaxCommand aka send_stale_files_to_max
     - SelectMaxInstanceCommand aka select_max_instance
+    - SelectMaxInstancesCommand aka select_max_instances
+    - RunMaxTestsCommand aka run_max_tests
     - OpenMaxHelpCommand aka open_max_help
+    - GotoMaxDefinitionCommand aka goto_max_definition
 
 See the README for details on how to use them.
 """
 from __future__ import unicode_literals
 
+import hashlib
+import html
+import io
 import os
-import re
+import threading
+import time
 import webbrowser
 import zipfile
 
 import sublime
 import sublime_plugin
 
+from . import apidocs
+from . import apiindex
+from . import broadcast
+from . import bufferindex
+from . import completioncache
+from . import completionworker
 from . import constants
+from . import discovery
 from . import filters
+from . import listeneroutput
+from . import mxsblocks
+from . import mxsdeps
+from . import ranking
+from . import sendqueue
+from . import symbolindex
+from . import tempstore
+from . import testrunner
+from . import transport
 from . import winapi
 
 
@@ -33,12 +58,63 @@ DEFAULT_DOCS_VERSION = "2019"
 # It is filled automatically when sending the first command.
 mainwindow = None
 
+# Transport used to deliver code to 3ds Max, see _get_transport().
+current_transport = None
+
+# The text of each MAXScript file as last sent to the current 3ds Max,
+# to send only the changed definitions, see SendChangesToMaxCommand.
+snapshots = mxsblocks.Snapshots()
+
+# The fileIn/include statements of MAXScript files and which of them the
+# current 3ds Max has loaded, see SendStaleFilesToMaxCommand.
+dependency_graph = mxsdeps.DependencyGraph()
+loaded_files = mxsdeps.LoadedFiles()
+
 # Used to preselect the last 3ds Max window in the quick panel.
 last_index = 0
 
+# The 3ds Max instances chosen for broadcasting, see _broadcast_cmd().
+broadcast_instances = []
+
+# Maps window handles to their Win32Transport used for broadcasting and
+# running tests, see _get_window_transport().
+window_transports = {}
+
+# Lazily built prefix index over the mxs API, see _get_api_index().
+# Only the API of one 3ds Max version is held at a time.
+api_index = None
+api_index_path = None
+
+# Memory-mapped docs index matching api_index, see _lookup_docs().
+doc_index = None
+doc_index_path = None
+doc_index_lock = threading.Lock()
+
+# Symbol indexes of the scripts in the folders of each window, keyed by
+# those folders, see _get_symbol_index().
+symbol_indexes = {}
+symbol_indexes_lock = threading.Lock()
+
+# Maps window handles to the 3ds Max version parsed from their title.
+window_versions = {}
+
+# Maps 3ds Max versions to the API file used for them.
+api_paths = {}
 
-def _get_api_lines():
+
+def _get_settings():
+    return sublime.load_settings(constants.SETTINGS_FILENAME)
+
+
+def _is_packed(path):
+    """Return if path points into a zipped .sublime-package."""
+    return ".sublime-package" in path
+
+
+def _get_api_lines(apipath=None):
     """Read the mxs API definition file and return as a list of lines."""
+    apipath = apipath or constants.APIPATH
+
     def get_decoded_lines(file_obj):
         content = file_obj.read()
         try:
@@ -48,13 +124,221 @@ def _get_api_lines():
         return content.split("\n")
 
     # Zipped .sublime-package as installed by package control.
-    if ".sublime-package" in constants.APIPATH:
-        apifile = os.path.basename(constants.APIPATH)
-        package = zipfile.ZipFile(os.path.dirname(constants.APIPATH), "r")
+    if _is_packed(apipath):
+        apifile = os.path.basename(apipath)
+        package = zipfile.ZipFile(os.path.dirname(apipath), "r")
         return get_decoded_lines(package.open(apifile))
     # Expanded folder, e.g. during development.
     else:
-        return get_decoded_lines(open(constants.APIPATH))
+        return get_decoded_lines(open(apipath))
+
+
+def _api_exists(apipath):
+    if _is_packed(apipath):
+        try:
+            package = zipfile.ZipFile(os.path.dirname(apipath), "r")
+        except (IOError, OSError, zipfile.BadZipfile):
+            return False
+        return os.path.basename(apipath) in package.namelist()
+    return os.path.isfile(apipath)
+
+
+def _get_api_path(max_version=None):
+    """Return the API file for a 3ds Max version.
+
+    Versioned files like maxscript-2019.api are optional, if there is
+    none for the version the generic maxscript.api is used.
+    """
+    if max_version is None:
+        return constants.APIPATH
+    if max_version not in api_paths:
+        apipath = os.path.join(
+            os.path.dirname(constants.APIPATH),
+            constants.VERSIONED_API_FILENAME.format(version=max_version))
+        if not _api_exists(apipath):
+            apipath = constants.APIPATH
+        api_paths[max_version] = apipath
+    return api_paths[max_version]
+
+
+def _get_api_source(apipath):
+    """Return the file the mxs API is read from.
+
+    This is the .sublime-package archive when installed via package
+    control, otherwise the expanded .api file itself.
+    """
+    if _is_packed(apipath):
+        return os.path.dirname(apipath)
+    return apipath
+
+
+def _get_api_signature(apipath):
+    """Identify the current state of the mxs API source by mtime and size."""
+    try:
+        stat = os.stat(_get_api_source(apipath))
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size, apipath)
+
+
+def _get_api_cachefile(apipath):
+    return os.path.join(sublime.cache_path(), constants.CACHE_DIRNAME,
+                        os.path.basename(apipath) + constants.CACHE_SUFFIX)
+
+
+def _get_connected_version():
+    """Return the version of the connected 3ds Max, None if unknown.
+
+    Unlike _get_max_version() this never searches for a 3ds Max window,
+    so it is cheap enough to be called on every completion query.
+    """
+    window = mainwindow
+    if window is None:
+        return None
+    handle = window.get_handle()
+    if handle not in window_versions:
+        window_versions[handle] = discovery.parse_max_version(
+            window.get_text())
+    return window_versions[handle]
+
+
+def _get_api_index():
+    """Return the mxs API prefix index for the connected 3ds Max version.
+
+    The index is built on first use and whenever the version changes,
+    evicting the previous one. Parsed indexes are persisted in Sublime's
+    cache folder, so the API text only needs to be parsed again after
+    the package changed.
+    """
+    global api_index, api_index_path
+    apipath = _get_api_path(_get_connected_version())
+    if api_index is None or apipath != api_index_path:
+        index = None
+        signature = _get_api_signature(apipath)
+        cachefile = _get_api_cachefile(apipath)
+        if signature is not None:
+            index = apiindex.load_cache(cachefile, signature)
+        if index is None:
+            index = apiindex.ApiIndex.from_lines(_get_api_lines(apipath))
+            if signature is not None:
+                apiindex.save_cache(cachefile, signature, index)
+        if api_index is not None:
+            # Cached completions still refer to the previous version.
+            completioncache.caches.clear()
+        api_index, api_index_path = index, apipath
+        filters.manager.set_namespace_index(index.namespaces)
+    return api_index
+
+
+def _get_docs_path(apipath):
+    """Return the optional docs file belonging to an API file."""
+    return os.path.splitext(apipath)[0] + constants.DOCS_EXTENSION
+
+
+def _lookup_docs(symbol):
+    """Return the docs record of symbol for the current API or None.
+
+    The memory-mapped docs index is built from the API symbols plus the
+    optional .docs file next to the API file and rebuilt only when
+    either of them changed. Looking up holds the lock, so switching to
+    another version cannot close the index in the middle of it.
+    """
+    index = _get_api_index()
+    apipath = api_index_path
+    with doc_index_lock:
+        if doc_index is None or apipath != doc_index_path:
+            _open_doc_index(index, apipath)
+        return doc_index.lookup(symbol)
+
+
+def _open_doc_index(index, apipath):
+    """Replace doc_index by the one for apipath, must hold the lock."""
+    global doc_index, doc_index_path
+    docspath = _get_docs_path(apipath)
+    has_docs = _api_exists(docspath)
+    signature = (_get_api_signature(apipath),
+                 _get_api_signature(docspath) if has_docs else None)
+
+    def get_entries():
+        docs = None
+        if has_docs:
+            docs = apidocs.parse_docs(_get_api_lines(docspath))
+        return apidocs.collect_entries(index.names, docs)
+
+    indexfile = os.path.join(
+        sublime.cache_path(), constants.CACHE_DIRNAME,
+        os.path.basename(apipath) + constants.DOCS_INDEX_SUFFIX)
+    if doc_index is not None:
+        doc_index.close()
+        doc_index = None
+    try:
+        doc_index = apidocs.open_index(indexfile, signature, get_entries)
+    except (IOError, OSError):
+        # Remember that there are no docs instead of trying again on
+        # every selection change.
+        doc_index = apidocs.MemoryDocIndex({})
+    doc_index_path = apipath
+
+
+def _get_symbol_cachefile(folders):
+    digest = hashlib.sha1("\n".join(folders).encode("utf-8")).hexdigest()
+    return os.path.join(sublime.cache_path(), constants.CACHE_DIRNAME,
+                        "workspace-" + digest[:16] +
+                        constants.SYMBOLS_CACHE_SUFFIX)
+
+
+def _get_symbol_index(window):
+    """Return the symbol index of the folders open in window or None.
+
+    A new index is loaded from its cache and brought up to date on a
+    background thread, until then it lacks the latest changes.
+    """
+    if window is None or not _get_settings().get("index_workspace", True):
+        return None
+    folders = tuple(sorted(window.folders()))
+    if not folders:
+        return None
+    with symbol_indexes_lock:
+        index = symbol_indexes.get(folders)
+        if index is not None:
+            return index
+        index = symbolindex.load_cache(_get_symbol_cachefile(folders),
+                                       folders)
+        if index is None:
+            index = symbolindex.SymbolIndex(folders)
+        symbol_indexes[folders] = index
+    thread = threading.Thread(target=_update_symbol_index, args=(index,))
+    thread.daemon = True
+    thread.start()
+    return index
+
+
+def _update_symbol_index(index, path=None):
+    """Re-index the changed files, or only path, and persist the index."""
+    if path is None:
+        index.update(constants.INDEX_WORKERS)
+    else:
+        index.update_file(path)
+    symbolindex.save_cache(_get_symbol_cachefile(index.folders), index)
+
+
+def _get_query_help_url(keyword):
+    """Return a URL to the MAXScript help, looking for given keyword.
+
+    The docs may need special handling regarding filtering and query
+    parameters.
+
+    Test URL for Max 2019:
+
+    http://help.autodesk.com/view/3DSMAX/2019/ENU/index.html?query=polyOp&cg=Scripting%20%26%20Customization  # noqa
+    """
+    query_param = "?query=" + keyword
+    max_version = _get_max_version()
+    url = constants.ONLINE_MAXSCRIPT_HELP_URL[max_version] + query_param
+    if max_version == DEFAULT_DOCS_VERSION:
+        # Make sure to search in a specific section of the docs.
+        url += r"&cg=Scripting%20%26%20Customization"
+    return url
 
 
 def _is_maxscriptfile(filepath):
@@ -69,90 +353,438 @@ def _is_pythonfile(filepath):
     return ext in (".py",)
 
 
-def _save_to_tempfile(text):
-    """Store code in a temporary maxscript file."""
-    with open(constants.TEMPFILE, "w") as tempfile:
-        tempfile.write(text)
+# Temporary files for multiline and Python code, see _save_to_tempfile().
+temp_store = tempstore.TempStore(constants.TEMPDIR, constants.TEMPFILE_PREFIX,
+                                 constants.TEMPFILE_COUNT,
+                                 constants.LEGACY_TEMPFILES)
 
 
-def _send_cmd_to_max(cmd):
-    """Try to find the 3ds Max window by title and the mini
-    macrorecorder by class.
+def _save_to_tempfile(text, extension):
+    """Store code in a temporary file and return its path or None."""
+    try:
+        return temp_store.get_path(text, extension)
+    except (IOError, OSError):
+        return None
+
 
-    Sends a string command and a return-key buttonstroke to it to
-    evaluate the command.
+def _iter_regions(view, regions, size=constants.STREAM_CHUNK):
+    """Yield the text of regions joined by newlines, in pieces.
 
+    Each piece holds at most size characters of a region.
     """
-    global mainwindow
+    for index, region in enumerate(regions):
+        if index:
+            yield "\n"
+        for start in range(region.begin(), region.end(), size):
+            yield view.substr(sublime.Region(
+                start, min(start + size, region.end())))
 
-    if mainwindow is None:
-        mainwindow = winapi.Window.find_window(
-            constants.TITLE_IDENTIFIER)
 
-    if mainwindow is None:
-        sublime.error_message(constants.MAX_NOT_FOUND)
-        return
+def _save_regions_to_tempfile(view, regions, extension):
+    """Stream the text of regions into a temporary file, return its path.
 
+    Returns None if the file could not be written.
+    """
     try:
-        mainwindow.find_child(text=None, cls="MXS_Scintilla")
-    except OSError:
-        # Window handle is invalid, 3ds Max has probably been closed.
-        # Call this function again and try to find one automatically.
-        mainwindow = None
-        _send_cmd_to_max(cmd)
-        return
+        return temp_store.get_path_streamed(_iter_regions(view, regions),
+                                            extension)
+    except (IOError, OSError):
+        return None
 
-    minimacrorecorder = mainwindow.find_child(text=None, cls="MXS_Scintilla")
-    # If the mini macrorecorder was not found, there is still a chance
-    # we are targetting an ancient Max version (e.g. 9) where the
-    # listener was not Scintilla based, but instead a rich edit box.
-    if minimacrorecorder is None:
-        statuspanel = mainwindow.find_child(text=None, cls="StatusPanel")
-        if statuspanel is None:
-            sublime.error_message(constants.RECORDER_NOT_FOUND)
-            return
-        minimacrorecorder = statuspanel.find_child(text=None, cls="RICHEDIT")
-        # Verbatim strings (the @ at sign) are also not yet supported.
-        cmd = cmd.replace("@", "")
-        cmd = cmd.replace("\\", "\\\\")
 
-    if minimacrorecorder is None:
+def _get_instance_item(instance):
+    """Return the text listing a 3ds Max instance in the quick panel."""
+    normtext = instance.title.replace("b'", "").replace("'", "")
+    return "{txt} ({hwnd})".format(txt=normtext,
+                                   hwnd=instance.window.get_handle())
+
+
+def _with_instances(callback):
+    """Call callback with the running 3ds Max instances on the UI thread.
+
+    The instances found before are used right away while the desktop is
+    scanned again in the background, so a picker opens immediately. Only
+    if none were found yet, callback waits for that scan.
+    """
+    instances = discovery.discovery.get_cached_instances()
+    if instances:
+        discovery.discovery.refresh_async()
+        callback(instances)
+    else:
+        discovery.discovery.refresh_async(
+            lambda found: sublime.set_timeout(lambda: callback(found), 0))
+
+
+def _find_mainwindow(wait=True):
+    """Return the window of the first 3ds Max instance found or None."""
+    instance = discovery.discovery.find_instance(wait)
+    if instance is None:
+        return None
+    window_versions[instance.window.get_handle()] = instance.version
+    return instance.window
+
+
+def _uses_socket_transport():
+    return _get_settings().get("transport", "win32") == "socket"
+
+
+def _get_transport():
+    """Return the transport to the 3ds Max instance we send code to.
+
+    By default commands are typed into the mini macrorecorder of
+    mainwindow. With "transport": "socket" they are sent to the listener
+    server of max/sublime3dsmax_listener.py instead. Raises
+    transport.MaxNotFoundError if no 3ds Max window could be found.
+    """
+    global mainwindow, current_transport
+
+    if _uses_socket_transport():
+        settings = _get_settings()
+        address = (settings.get("socket_host", "127.0.0.1"),
+                   settings.get("socket_port", 27100))
+        if not (isinstance(current_transport, transport.SocketTransport) and
+                (current_transport.host, current_transport.port) == address):
+            if current_transport is not None:
+                current_transport.close()
+            current_transport = transport.SocketTransport(
+                address[0], address[1], settings.get("socket_timeout", 30))
+        return current_transport
+
+    if mainwindow is None:
+        mainwindow = _find_mainwindow()
+    if mainwindow is None:
+        raise transport.MaxNotFoundError()
+    if not (isinstance(current_transport, transport.Win32Transport) and
+            current_transport.window is mainwindow):
+        if current_transport is not None:
+            current_transport.close()
+        current_transport = transport.Win32Transport(mainwindow, winapi)
+    return current_transport
+
+
+def _can_send_code():
+    """Return if whole scripts can be sent without a temporary file."""
+    return _uses_socket_transport()
+
+
+def _send_to_max(send, retry=True, on_sent=None):
+    """Call send(transport) for the current 3ds Max and report failures.
+
+    Returns the reply of 3ds Max if the transport gives one. on_sent()
+    is called if the send succeeded and 3ds Max reported no error.
+    """
+    global mainwindow
+
+    try:
+        target = _get_transport()
+        _watch_output(target)
+        reply = send(target)
+    except transport.MaxNotFoundError:
+        if retry and mainwindow is not None and not _uses_socket_transport():
+            # Window handle is invalid, 3ds Max has probably been closed.
+            # Call this function again and try to find one automatically.
+            mainwindow = None
+            _forget_sent()
+            discovery.discovery.invalidate()
+            return _send_to_max(send, retry=False, on_sent=on_sent)
+        sublime.error_message(constants.MAX_NOT_FOUND)
+        return None
+    except transport.RecorderNotFoundError:
         sublime.error_message(constants.RECORDER_NOT_FOUND)
+        return None
+    except transport.TransportError as e:
+        sublime.error_message("{0} {1}".format(constants.PREFIX, e))
+        return None
+
+    if reply is not None:
+        _show_reply(reply)
+    if on_sent is not None and (reply is None or reply.get("ok", True)):
+        on_sent()
+    return reply
+
+
+def _append_output(text):
+    """Append text to the Listener output panel of the active window."""
+    def append():
+        window = sublime.active_window()
+        panel = window.find_output_panel(constants.OUTPUT_PANEL)
+        if panel is None:
+            panel = window.create_output_panel(constants.OUTPUT_PANEL)
+        panel.run_command("append", {"characters": text, "force": True,
+                                     "scroll_to_end": True})
+        window.run_command("show_panel",
+                           {"panel": "output." + constants.OUTPUT_PANEL})
+
+    sublime.set_timeout(append, 0)
+
+
+# Streams the Listener output of the Win32 transport, see _watch_output().
+output_poller = listeneroutput.TailPoller(_append_output)
+
+
+def _watch_output(target):
+    """Start streaming the Listener output of target if it has one.
+
+    The socket transport returns the output with its reply instead.
+    """
+    if not _get_settings().get("listener_output", True):
         return
+    if isinstance(target, transport.Win32Transport):
+        tail = target.get_output_tail()
+        if tail is not None:
+            output_poller.watch(tail)
+
 
+def _show_reply(reply):
+    """Show the output of code evaluated by the socket transport."""
+    text = reply.get("output") or ""
+    if reply.get("result") is not None:
+        text += "{0}\n".format(reply["result"])
+    if text and _get_settings().get("listener_output", True):
+        _append_output(text)
+    if not reply.get("ok", True):
+        sublime.status_message(constants.PREFIX +
+                               " Error in 3ds Max, see output panel")
+
+
+def _forget_sent():
+    """Forget what was sent, as 3ds Max is a different one now."""
+    snapshots.clear()
+    loaded_files.clear()
+
+
+def _send_cmd_to_max(cmd, on_sent=None):
+    """Send a single line of MAXScript to 3ds Max to evaluate it."""
     sublime.status_message('Send to 3ds Max: {cmd}'.format(
         **locals())[:-1])  # Cut ';'
-    cmd = cmd.encode("utf-8")  # Needed for ST3!
-    minimacrorecorder.send(winapi.WM_SETTEXT, 0, cmd)
-    minimacrorecorder.send(winapi.WM_CHAR, winapi.VK_RETURN, 0)
-    minimacrorecorder = None
+    return _send_to_max(lambda target: target.send_command(cmd),
+                        on_sent=on_sent)
+
+
+def _get_window_transport(window):
+    """Return a Win32Transport for window, kept for the next send."""
+    handle = window.get_handle()
+    if handle not in window_transports:
+        window_transports[handle] = transport.Win32Transport(window, winapi)
+    return window_transports[handle]
+
+
+def _broadcast_cmd(cmd):
+    """Send a line of MAXScript to all instances chosen for broadcasting.
+
+    The instances are sent to concurrently, a report of which ones
+    succeeded is shown in the output panel.
+    """
+    targets = [(_get_instance_item(instance),
+                _get_window_transport(instance.window))
+               for instance in broadcast_instances
+               if instance.window.is_valid()]
+    if not targets:
+        sublime.error_message(constants.NO_BROADCAST_TARGETS)
+        return None
+
+    sublime.status_message("Broadcast to {0} 3ds Max instances: {1}".format(
+        len(targets), cmd)[:-1])  # Cut ';'
+    results = broadcast.broadcast(
+        targets, lambda target: target.send_command(cmd),
+        constants.BROADCAST_WORKERS)
+    _append_output(broadcast.format_report(results))
+    sublime.status_message(broadcast.get_summary(results))
+    return results
+
+
+def _get_test_targets():
+    """Return (name, transport) of every 3ds Max instance to run tests on.
+
+    With the socket transport these are the listener servers answering
+    on the ports 3ds Max instances take, otherwise all Max windows.
+    """
+    if _uses_socket_transport():
+        settings = _get_settings()
+        host = settings.get("socket_host", "127.0.0.1")
+        port = settings.get("socket_port", 27100)
+        targets = []
+        for candidate in range(port, port + constants.SOCKET_PORT_RANGE):
+            target = transport.SocketTransport(
+                host, candidate, settings.get("socket_timeout", 30))
+            if target.is_alive():
+                targets.append(("{0}:{1}".format(host, candidate), target))
+        return targets
+    return [(_get_instance_item(instance),
+             _get_window_transport(instance.window))
+            for instance in discovery.discovery.get_instances(wait=True)]
+
+
+def _run_tests(scripts):
+    """Run test scripts on all 3ds Max instances and report the results.
+
+    Blocks until all tests ran, so call it from a background thread.
+    """
+    targets = _get_test_targets()
+    if not targets:
+        sublime.error_message(constants.MAX_NOT_FOUND)
+        return None
+    _append_output("Running {0} tests on {1} 3ds Max instances\n".format(
+        len(scripts), len(targets)))
+
+    def on_result(result):
+        _append_output(testrunner.format_result(result))
+
+    start = time.time()
+    try:
+        results = testrunner.TestRunner(targets, on_result).run(scripts)
+    finally:
+        for _, target in targets:
+            if isinstance(target, transport.SocketTransport):
+                target.close()
+    summary = testrunner.format_summary(results, time.time() - start)
+    _append_output(summary)
+    sublime.status_message(constants.PREFIX + " " + summary.strip())
+    return results
+
+
+def _send_code_to_max(code, language, on_sent=None):
+    """Send a whole 'maxscript' or 'python' script to 3ds Max.
+
+    Only possible if _can_send_code(), otherwise callers have to go
+    through a temporary file.
+    """
+    sublime.status_message("Send to 3ds Max: {0} lines of {1}".format(
+        code.count("\n") + 1, language))
+    return _send_to_max(lambda target: target.send_code(code, language),
+                        on_sent=on_sent)
+
+
+def _show_send_status(pending, active):
+    """Show the state of the send queue in the status bar."""
+    if active:
+        text = "3ds Max: sending, {0} queued".format(pending)
+    elif pending:
+        text = "3ds Max: {0} queued".format(pending)
+    else:
+        text = None
+
+    def show():
+        view = sublime.active_window().active_view()
+        if view is None:
+            return
+        if text:
+            view.set_status("sublime3dsmax_queue", text)
+        else:
+            view.erase_status("sublime3dsmax_queue")
+
+    sublime.set_timeout(show, 0)
+
+
+# Sends are delivered in the background, see _enqueue_send().
+send_queue = sendqueue.SendQueue(constants.SEND_QUEUE_SIZE,
+                                 on_change=_show_send_status)
+
+
+def _enqueue_send(key, func):
+    """Run func() on the send queue unless an equal send is pending.
+
+    key identifies what is sent, e.g. the command itself, so repeated
+    sends of the same thing are only delivered once.
+    """
+    if not send_queue.put(key, func):
+        sublime.status_message(constants.QUEUE_FULL)
+
+
+def _enqueue_cmd(cmd, to_all=False, on_sent=None):
+    if to_all:
+        _enqueue_send(("broadcast", cmd), lambda: _broadcast_cmd(cmd))
+    else:
+        _enqueue_send(("cmd", cmd), lambda: _send_cmd_to_max(cmd, on_sent))
+
+
+def _enqueue_code(code, language, on_sent=None):
+    _enqueue_send(("code", language, code),
+                  lambda: _send_code_to_max(code, language, on_sent))
+
+
+def _get_tempfile_import(path, is_mxs):
+    if is_mxs:
+        return 'fileIn @"{0}"\r\n'.format(path)
+    return 'python.executeFile @"{0}"\r\n'.format(path)
+
+
+def _enqueue_tempfile(text, is_mxs, to_all=False, on_sent=None):
+    """Queue saving text to a tempfile and sending the import of it.
+
+    The tempfile is only written right before the send, so that it has
+    not been evicted from the temp_store by then. on_sent is not called
+    for broadcasts.
+    """
+    def send():
+        path = _save_to_tempfile(text, ".ms" if is_mxs else ".py")
+        _send_tempfile(path, is_mxs, to_all, on_sent)
+
+    _enqueue_send(("tempfile", is_mxs, text, to_all), send)
+
+
+def _enqueue_regions(view, regions, is_mxs, to_all=False):
+    """Queue streaming regions of view to a tempfile and importing it.
+
+    The text is read from the view only when the send is due, so large
+    selections do not block the UI thread. If the view was edited by
+    then, the regions may not hold the selected code anymore and
+    nothing is sent.
+    """
+    change_count = view.change_count()
+
+    def send():
+        if view.change_count() != change_count:
+            sublime.error_message(constants.SELECTION_CHANGED)
+            return
+        path = _save_regions_to_tempfile(view, regions,
+                                         ".ms" if is_mxs else ".py")
+        if view.change_count() != change_count:
+            sublime.error_message(constants.SELECTION_CHANGED)
+            return
+        _send_tempfile(path, is_mxs, to_all)
+
+    key = ("regions", view.id(), change_count,
+           tuple((region.a, region.b) for region in regions), is_mxs, to_all)
+    _enqueue_send(key, send)
+
+
+def _send_tempfile(path, is_mxs, to_all=False, on_sent=None):
+    """Send the import of a tempfile, path None if it was not written."""
+    if path is None:
+        sublime.error_message(constants.NO_TEMP)
+        return
+    cmd = _get_tempfile_import(path, is_mxs)
+    if to_all:
+        _broadcast_cmd(cmd)
+    else:
+        _send_cmd_to_max(cmd, on_sent)
 
 
 def _get_max_version():
     """Try to determine the version of 3ds Max we are connected to."""
     global mainwindow
     if mainwindow is None:
-        mainwindow = winapi.Window.find_window(
-            constants.TITLE_IDENTIFIER)
+        mainwindow = _find_mainwindow(wait=False)
 
     # Default to 2018 help, this has the most updated docs and will
     # filter to Maxscript results.
     max_version = DEFAULT_DOCS_VERSION
 
     if mainwindow is not None:
-        window_text = mainwindow.get_text()
-        matches = re.findall(r"(?:Max )(2\d{3})", window_text)
-        if matches:
-            last_match = matches[-1]
-            max_version = last_match
+        max_version = _get_connected_version() or max_version
 
     return max_version
 
 
 class SendFileToMaxCommand(sublime_plugin.TextCommand):
-    """Send the current file by using 'fileIn <file>'."""
+    """Send the current file by using 'fileIn <file>'.
 
-    def run(self, edit):
+    With broadcast it is sent to all instances chosen with
+    select_max_instances instead of the current one.
+    """
+
+    def run(self, edit, broadcast=False):
         currentfile = self.view.file_name()
         if currentfile is None:
             sublime.error_message(constants.NOT_SAVED)
@@ -163,25 +795,153 @@ class SendFileToMaxCommand(sublime_plugin.TextCommand):
 
         if is_mxs:
             cmd = 'fileIn @"{0}"\r\n'.format(currentfile)
-            _send_cmd_to_max(cmd)
+            _enqueue_cmd(cmd, broadcast,
+                         on_sent=lambda: _mark_sent(currentfile))
         elif is_python:
             cmd = 'python.executeFile @"{0}"\r\n'.format(currentfile)
-            _send_cmd_to_max(cmd)
+            _enqueue_cmd(cmd, broadcast)
         else:
             sublime.error_message(constants.NO_SUPPORTED_FILE)
 
 
+def _update_snapshot(path):
+    """Remember the file at path as 3ds Max has just evaluated it."""
+    try:
+        with io.open(path, encoding="utf-8", errors="replace") as f:
+            snapshots.update(path, f.read())
+    except (IOError, OSError):
+        pass
+
+
+def _mark_loaded(units):
+    """Remember units as loaded into 3ds Max by fileIn."""
+    loaded_files.mark(units)
+    for unit in units:
+        _update_snapshot(unit.path)
+
+
+def _mark_sent(path):
+    """Remember a script and all files it loads as sent by fileIn."""
+    _mark_loaded(dependency_graph.get_load_order(path))
+
+
+def _send_stale_files(root):
+    """Send the files loaded by root that changed, dependencies first.
+
+    Stops at the first file that could not be sent.
+    """
+    order = dependency_graph.get_load_order(root)
+    units = loaded_files.get_stale_units(order)
+    if not units:
+        sublime.status_message(constants.NO_STALE_FILES)
+        return
+    for unit in units:
+        reloaded = mxsdeps.get_reloaded(unit, order)
+        _send_cmd_to_max(_get_tempfile_import(unit.path, True),
+                         on_sent=lambda: _mark_loaded(reloaded))
+        if not loaded_files.is_loaded(unit):
+            return
+    sublime.status_message("Sent {0} changed files to 3ds Max: {1}".format(
+        len(units), ", ".join(os.path.basename(unit.path)
+                              for unit in units)))
+
+
+class SendStaleFilesToMaxCommand(sublime_plugin.TextCommand):
+    """Send the scripts loaded by the current one that changed.
+
+    The fileIn and include statements are followed from the current
+    file and every script whose content changed since it was last sent
+    is loaded again, dependencies first. Unchanged ones are skipped, the
+    current 3ds Max has loaded them already.
+    """
+    def run(self, edit):
+        currentfile = self.view.file_name()
+        if currentfile is None:
+            sublime.error_message(constants.NOT_SAVED)
+            return
+        if not _is_maxscriptfile(currentfile):
+            self.view.run_command("send_file_to_max")
+            return
+        _enqueue_send(("stale", currentfile),
+                      lambda: _send_stale_files(currentfile))
+
+
+class SendChangesToMaxCommand(sublime_plugin.TextCommand):
+    """Send only the top-level definitions changed since the last send.
+
+    fn, struct, rollout, macroScript etc. blocks whose text differs from
+    what was last sent of the file are evaluated, so that re-sending a
+    large script after editing one function is quick. The whole file is
+    sent if it was not sent before or other top-level code changed.
+    """
+    def run(self, edit):
+        currentfile = self.view.file_name()
+        if currentfile is None:
+            sublime.error_message(constants.NOT_SAVED)
+            return
+        if not _is_maxscriptfile(currentfile):
+            self.view.run_command("send_file_to_max")
+            return
+
+        text = self.view.substr(sublime.Region(0, self.view.size()))
+        blocks = snapshots.get_changed_blocks(currentfile, text)
+        if blocks is None:
+            code = text
+        elif not blocks:
+            sublime.status_message(constants.NO_CHANGES)
+            return
+        else:
+            code = "\n".join(block.text for block in blocks)
+            sublime.status_message("Send to 3ds Max: {0}".format(
+                ", ".join(block.name for block in blocks)))
+
+        def on_sent():
+            snapshots.update(currentfile, text)
+
+        if _can_send_code():
+            _enqueue_code(code, "maxscript", on_sent)
+        else:
+            _enqueue_tempfile(code, True, on_sent=on_sent)
+
+
 class SendSelectionToMaxCommand(sublime_plugin.TextCommand):
     """Send selected part of the file.
 
-    Selection is extended to full line(s).
+    Selection is extended to full line(s). With broadcast it is sent to
+    all instances chosen with select_max_instances. The regions of all
+    cursors are sent together, in the order they appear in the file.
 
     """
     def expand(self, line):
         """Expand selection to encompass whole line."""
         self.view.run_command("expand_selection", {"to": line.begin()})
 
-    def run(self, edit):
+    def is_singleline(self, region):
+        return (self.view.rowcol(region.begin())[0] ==
+                self.view.rowcol(region.end())[0])
+
+    def get_parts(self):
+        """Return the regions to send, each expanded as described in run().
+
+        Regions are sorted and ones that overlap or touch after being
+        expanded are merged, e.g. two cursors on the same line or part of
+        a line followed by a multiline selection starting on it.
+        """
+        parts = []
+        for region in sorted(self.view.sel(), key=lambda r: r.begin()):
+            line = self.view.line(region)
+            if region.empty() or not self.is_singleline(line):
+                self.expand(line)
+                region = line
+            begin, end = region.begin(), region.end()
+            while parts and parts[-1].end() >= begin:
+                previous = parts.pop()
+                begin = min(begin, previous.begin())
+                end = max(end, previous.end())
+            parts.append(sublime.Region(begin, end))
+        return parts
+
+    def run(self, edit, broadcast=False):
         """Analyse selection and determine a method to send it to 3ds Max.
 
         Single line maxscript commands can be send directly. Python
@@ -189,14 +949,16 @@ class SendSelectionToMaxCommand(sublime_plugin.TextCommand):
         quotation marks or backslashes, so it is safer to send them via
         a temporary file that we import. That is also the method to send
         multiline code, since the mini macrorecorder does not accept
-        multiline input.
-        """
-        def get_mxs_tempfile_import():
-            return 'fileIn @"{0}"\r\n'.format(constants.TEMPFILE)
+        multiline input. The socket transport takes any code as is.
 
-        def get_python_tempfile_import():
-            return 'python.executeFile @"{0}"\r\n'.format(constants.TEMPFILE)
+        With several cursors, each region is expanded like a single one
+        and all of them are joined into one script, so they are evaluated
+        with a single import.
 
+        Large selections, like baked animation data, are streamed into
+        their temporary file once their send is due, without ever holding
+        them in memory as a whole, and always imported from there.
+        """
         # We need the user to have an actual file opened so that we can
         # derive the language from its file extension.
         currentfile = self.view.file_name()
@@ -206,48 +968,58 @@ class SendSelectionToMaxCommand(sublime_plugin.TextCommand):
 
         is_mxs = _is_maxscriptfile(currentfile)
         is_python = _is_pythonfile(currentfile)
+        language = "maxscript" if is_mxs else "python"
+        # Broadcasting always goes through the mini macrorecorder.
+        send_code = _can_send_code() and not broadcast
 
-        regions = [region for region in self.view.sel()]
-        for region in regions:
-            line = self.view.line(region)
-            text = self.view.substr(line)
+        parts = self.get_parts()
+        if not parts:
+            return
+        is_multiline = len(parts) > 1 or not self.is_singleline(parts[0])
 
-            is_empty = region.empty()
-            is_singleline = len(text.split("\n")) == 1
-            is_multiline = not (is_empty or is_singleline)
+        if is_multiline:
+            size = sum(part.size() for part in parts) + len(parts) - 1
+            if size > constants.STREAM_THRESHOLD:
+                _enqueue_regions(self.view, parts, is_mxs, broadcast)
+                return
 
-            if is_multiline:
-                self.expand(line)
-                _save_to_tempfile(text)
-                if not os.path.isfile(constants.TEMPFILE):
-                    sublime.error_message(constants.NO_TEMP)
-                    return
+        text = "\n".join(self.view.substr(part) for part in parts)
+        if is_multiline:
+            if send_code:
+                _enqueue_code(text, language)
+            else:
+                _enqueue_tempfile(text, is_mxs, broadcast)
+        elif is_mxs:
+            _enqueue_cmd('{0}\r\n'.format(text), broadcast)
+        elif send_code:
+            _enqueue_code(text, language)
+        elif is_python:
+            _enqueue_tempfile(text, is_mxs, broadcast)
 
-                if is_mxs:
-                    cmd = get_mxs_tempfile_import()
-                else:
-                    cmd = get_python_tempfile_import()
 
-                _send_cmd_to_max(cmd)
-                return
-            else:
-                if is_empty:
-                    self.expand(line)
-                    text = self.view.substr(self.view.line(region))
-                elif is_singleline:
-                    text = self.view.substr(region)
-
-                if is_mxs:
-                    cmd = '{0}\r\n'.format(text)
-                elif is_python:
-                    _save_to_tempfile(text)
-                    if not os.path.isfile(constants.TEMPFILE):
-                        sublime.error_message(constants.NO_TEMP)
-                        return
-                    cmd = get_python_tempfile_import()
-
-                _send_cmd_to_max(cmd)
-                return
+class RunMaxTestsCommand(sublime_plugin.TextCommand):
+    """Run the MAXScript tests of a folder on all 3ds Max instances.
+
+    The test scripts are sharded across the instances and report via
+    AssertReporter. Without a directory argument it is asked for.
+    """
+    def run(self, edit, directory=None):
+        if directory is not None:
+            self.start(directory)
+            return
+        currentfile = self.view.file_name()
+        initial = os.path.dirname(currentfile) if currentfile else ""
+        sublime.active_window().show_input_panel(
+            "Folder of MAXScript tests:", initial, self.start, None, None)
+
+    def start(self, directory):
+        scripts = testrunner.find_tests(directory)
+        if not scripts:
+            sublime.error_message(constants.NO_TESTS)
+            return
+        thread = threading.Thread(target=_run_tests, args=(scripts,))
+        thread.daemon = True
+        thread.start()
 
 
 class OpenMaxHelpCommand(sublime_plugin.TextCommand):
@@ -266,22 +1038,59 @@ class OpenMaxHelpCommand(sublime_plugin.TextCommand):
                 webbrowser.open(url, new=0, autoraise=True)
 
     def get_query_help_url(self, keyword):
-        """Return a URL to the MAXScript help, looking for given keyword.
+        return _get_query_help_url(keyword)
 
-        The docs may need special handling regarding filtering and query
-        parameters.
 
-        Test URL for Max 2019:
+class GotoMaxDefinitionCommand(sublime_plugin.TextCommand):
+    """Jump to the definition of the word under the cursor.
 
-        http://help.autodesk.com/view/3DSMAX/2019/ENU/index.html?query=polyOp&cg=Scripting%20%26%20Customization  # noqa
-        """
-        query_param = "?query=" + keyword
-        max_version = _get_max_version()
-        url = constants.ONLINE_MAXSCRIPT_HELP_URL[max_version] + query_param
-        if max_version == DEFAULT_DOCS_VERSION:
-            # Make sure to search in a specific section of the docs.
-            url += r"&cg=Scripting%20%26%20Customization"
-        return url
+    It is looked up in the current file and all scripts in the open
+    folders, if there are several a quick panel lets you pick one.
+    """
+    def run(self, edit):
+        if not len(self.view.sel()):
+            return
+        word = self.view.substr(self.view.word(self.view.sel()[0]))
+        currentfile = self.view.file_name()
+        text = self.view.substr(sublime.Region(0, self.view.size()))
+        locations = [(currentfile,) + symbol
+                     for symbol in symbolindex.extract_symbols(text)
+                     if symbol[0].lower() == word.lower()]
+        index = _get_symbol_index(self.view.window())
+        if index is not None:
+            current = os.path.normcase(currentfile or "")
+            locations += [location for location in index.find(word)
+                          if os.path.normcase(location[0]) != current]
+        if not locations:
+            sublime.status_message(constants.NO_DEFINITION)
+            return
+        if len(locations) == 1:
+            self.open(locations[0])
+            return
+
+        items = []
+        for path, name, kind, line, container in locations:
+            if container is not None:
+                name = container + "." + name
+            items.append(["{0} ({1})".format(name, kind),
+                          "{0}:{1}".format(path or "untitled", line + 1)])
+
+        def on_select(idx):
+            if idx != -1:
+                self.open(locations[idx])
+
+        self.view.window().show_quick_panel(items, on_select)
+
+    def open(self, location):
+        path, line = location[0], location[3]
+        if path is None:
+            point = self.view.text_point(line, 0)
+            self.view.sel().clear()
+            self.view.sel().add(sublime.Region(point))
+            self.view.show_at_center(point)
+            return
+        self.view.window().open_file("{0}:{1}".format(path, line + 1),
+                                     sublime.ENCODED_POSITION)
 
 
 class SelectMaxInstanceCommand(sublime_plugin.TextCommand):
@@ -290,14 +1099,14 @@ class SelectMaxInstanceCommand(sublime_plugin.TextCommand):
     The chosen instance is used from then on to send commands to.
     """
     def run(self, edit):
+        _with_instances(self.show)
+
+    def show(self, candidates):
         item2window = {}
-        candidates = winapi.Window.find_windows(
-            constants.TITLE_IDENTIFIER)
-        for window in candidates:
-            text = window.get_text()
-            normtext = text.replace("b'", "").replace("'", "")
-            item = ("{txt} ({hwnd})".format(txt=normtext,
-                                            hwnd=window.get_handle()))
+        for instance in candidates:
+            window = instance.window
+            window_versions[window.get_handle()] = instance.version
+            item = _get_instance_item(instance)
             item2window[item] = window
 
         items = list(item2window.keys())
@@ -311,6 +1120,8 @@ class SelectMaxInstanceCommand(sublime_plugin.TextCommand):
 
             item = items[idx]
             global mainwindow
+            if item2window[item] is not mainwindow:
+                _forget_sent()
             mainwindow = item2window[item]
 
             sublime.message_dialog(constants.PREFIX +
@@ -326,6 +1137,57 @@ class SelectMaxInstanceCommand(sublime_plugin.TextCommand):
                                                  on_highlighted)
 
 
+class SelectMaxInstancesCommand(sublime_plugin.TextCommand):
+    """Display a dialog to check the 3ds Max instances to broadcast to.
+
+    Picking an instance toggles it, the first item confirms the choice.
+    The broadcast variants of the send commands then send to all of
+    them at once.
+    """
+    def run(self, edit):
+        _with_instances(self.pick)
+
+    def pick(self, instances):
+        if not instances:
+            sublime.error_message(constants.MAX_NOT_FOUND)
+            return
+        for instance in instances:
+            window_versions[instance.window.get_handle()] = instance.version
+        checked = set(instance.window.get_handle()
+                      for instance in broadcast_instances)
+        self.show(instances, checked, 0)
+
+    def show(self, instances, checked, selected_index):
+        items = ["Broadcast to {0} checked instances".format(len(checked))]
+        for instance in instances:
+            mark = "[x]" if instance.window.get_handle() in checked else "[ ]"
+            items.append("{0} {1}".format(mark, _get_instance_item(instance)))
+
+        def on_select(idx):
+            if idx == -1:
+                return
+            if idx == 0:
+                global broadcast_instances
+                broadcast_instances = [
+                    instance for instance in instances
+                    if instance.window.get_handle() in checked]
+                sublime.status_message(
+                    "{0} Broadcasting to {1} instances".format(
+                        constants.PREFIX, len(broadcast_instances)))
+                return
+            handle = instances[idx - 1].window.get_handle()
+            if handle in checked:
+                checked.remove(handle)
+            else:
+                checked.add(handle)
+            # The panel closes on select, open it again for the next pick.
+            sublime.set_timeout(
+                lambda: self.show(instances, checked, idx), 0)
+
+        sublime.active_window().show_quick_panel(items, on_select, 0,
+                                                 selected_index)
+
+
 class Completions(sublime_plugin.EventListener):
     """Handle auto-completion from file content and the official API.
 
@@ -336,32 +1198,252 @@ class Completions(sublime_plugin.EventListener):
         polyOps.autosmooth
         ...
     """
-    completions_list = []
-
     def is_mxs(self, view):
         return view.match_selector(view.id(), "source.maxscript")
 
     def on_activated(self, view):
-        if self.is_mxs(view) and not self.completions_list:
-            self.completions_list = _get_api_lines()
+        if self.is_mxs(view):
+            _get_api_index()
+            _get_symbol_index(view.window())
 
-    def on_query_completions(self, view, prefix, locations):
+    def on_post_save_async(self, view):
+        path = view.file_name()
+        if path and self.is_mxs(view):
+            index = _get_symbol_index(view.window())
+            if index is not None and index.contains(path):
+                _update_symbol_index(index, path)
+
+    def on_modified_async(self, view):
         if self.is_mxs(view):
-            self.completions_list = _get_api_lines()
-            comp_default = set(view.extract_completions(prefix))
-            completions = set(list(self.completions_list))
-            comp_default = comp_default - completions
-            completions = list(comp_default) + list(completions)
+            bufferindex.get_index(view)
+            if not hasattr(sublime, "CompletionList"):
+                self.prewarm(view)
+
+    def on_selection_modified_async(self, view):
+        if self.is_mxs(view):
+            bufferindex.note_selection(view)
+
+    def on_close(self, view):
+        completionworker.worker.cancel(view.id())
+        bufferindex.discard_index(view)
+        completioncache.discard_cache(view)
+
+    def on_post_text_command(self, view, command_name, args):
+        if command_name in ("commit_completion", "insert_best_completion"):
+            if self.is_mxs(view) and len(view.sel()):
+                ranking.ranker.record_use(filters.get_completion_query(
+                    view, view.sel()[0].b))
+
+    def get_words(self, view, prefix, query, api):
+        """Return the words of the buffer and workspace matching query.
+
+        Both change while typing and indexing, so unlike the API they
+        are looked up again for every query.
+        """
+        buffer_index = bufferindex.get_index(view)
+        # The word being typed is in the buffer as well, leave it out.
+        words = [word for word in buffer_index.find(prefix[:1])
+                 if word not in api and word != prefix]
+        symbol_index = _get_symbol_index(view.window())
+        if symbol_index is not None:
+            words += [name for name in
+                      symbol_index.names.find(ranking.get_seed(query))
+                      if name not in api and name not in buffer_index.counts]
+        return words
+
+    def get_matches(self, view, prefix, locations, query, cache):
+        """Return all completions matching query, unranked.
+
+        Matches of a shorter cached query are narrowed down if possible,
+        only the words of the buffer and the workspace are looked up
+        again since they may have changed in the meantime.
+        """
+        api = _get_api_index()
+        cached = cache.get_matches(query)
+        if cached is None:
+            completions = self.get_words(view, prefix, query, api) + \
+                api.find(ranking.get_seed(query))
             completions = [(attr, attr) for attr in completions]
             completions = filters.manager.apply_filters(
                 view, prefix, locations, completions)
-            return completions
+        else:
+            completions = [c for c in cached if c[0] in api]
+            if not filters.is_namespace_query(query):
+                completions += [(word, word) for word in
+                                self.get_words(view, prefix, query, api)]
+        return [c for c in completions
+                if ranking.match(query, c[0]) is not None]
+
+    def compute(self, view, prefix, locations, job=None):
+        """Return the ranked completions, memoized per view.
+
+        When running as a background job, stale work is dropped between
+        the expensive steps as soon as a newer keystroke arrived.
+        """
+        query = filters.get_completion_query(view, locations[0])
+        change_count = view.change_count()
+        cache = completioncache.get_cache(view)
+        result = cache.get_result(query, change_count)
+        if result is not None:
+            return result
+
+        if job is not None:
+            job.check()
+        matches = self.get_matches(view, prefix, locations, query, cache)
+        if job is not None:
+            job.check()
+        limit = _get_settings().get("max_completions", 0)
+        result = ranking.ranker.top(query, matches, limit,
+                                    bufferindex.get_index(view).counts)
+        cache.put(query, change_count, matches, result)
+        return result
+
+    def prewarm(self, view):
+        """Compute completions for the cursor ahead of the query (ST3).
+
+        Sublime 3 can only take completions synchronously, so we start
+        computing in the background as soon as the buffer changed and
+        on_query_completions then finds the result in the cache.
+        """
+        if not len(view.sel()):
+            return
+        location = view.sel()[0].b
+        query = filters.get_completion_query(view, location)
+        if not query:
+            completionworker.worker.cancel(view.id())
+            return
+        prefix = query.rpartition(".")[2]
+        completionworker.worker.submit(
+            view.id(),
+            lambda job: self.compute(view, prefix, [location], job))
+
+    def get_flags(self, result):
+        """Return the flags of a Sublime 4 CompletionList for result.
+
+        Sublime 4 narrows an open completion popup down by itself and
+        only asks again with DYNAMIC_COMPLETIONS, which is needed when
+        max_completions cut off matches that may fit the longer prefix.
+        """
+        limit = _get_settings().get("max_completions", 0)
+        if limit and len(result) >= limit:
+            return sublime.DYNAMIC_COMPLETIONS
+        return 0
+
+    def on_query_completions(self, view, prefix, locations):
+        if self.is_mxs(view):
+            query = filters.get_completion_query(view, locations[0])
+            cache = completioncache.get_cache(view)
+            result = cache.get_result(query, view.change_count())
+            if result is not None:
+                if hasattr(sublime, "CompletionList"):
+                    return sublime.CompletionList(result,
+                                                  self.get_flags(result))
+                return result
+
+            # Sublime 4 accepts completions delivered later from any thread.
+            if hasattr(sublime, "CompletionList"):
+                completion_list = sublime.CompletionList()
+
+                def deliver(result):
+                    completion_list.set_completions(result,
+                                                    self.get_flags(result))
+
+                completionworker.worker.submit(
+                    view.id(),
+                    lambda job: self.compute(view, prefix, locations, job),
+                    deliver,
+                    lambda: completion_list.set_completions([]))
+                return completion_list
+
+            completionworker.worker.cancel(view.id())
+            return self.compute(view, prefix, locations)
+
+
+if hasattr(sublime_plugin, "TextChangeListener"):
+    class BufferChanges(sublime_plugin.TextChangeListener):
+        """Tell the buffer indexes which rows an edit changed (ST4).
+
+        Without this, Sublime 3 has them guess from the selection.
+        """
+        @classmethod
+        def is_applicable(cls, buffer):
+            view = buffer.primary_view()
+            return view is not None and \
+                view.match_selector(0, "source.maxscript")
+
+        def on_text_changed(self, changes):
+            views = self.buffer.views()
+            for change in changes:
+                first, old_last = change.a.row, change.b.row
+                delta = change.str.count("\n") - (old_last - first)
+                for view in views:
+                    bufferindex.note_changes(view, first, old_last, delta)
+
+
+class ApiDocs(sublime_plugin.EventListener):
+    """Show the docs of API symbols on hover and as signature hint.
+
+    Hovering e.g. polyop.getVert opens a popup with its signature and
+    description. While the cursor is behind a known function, its
+    signature is shown in the status bar.
+    """
+    status_key = "sublime3dsmax_signature"
+
+    def is_mxs(self, view):
+        return view.match_selector(view.id(), "source.maxscript")
+
+    def lookup(self, view, point):
+        """Return the docs record of the dotted word at point or None."""
+        word = view.word(point)
+        symbol = filters.get_completion_query(view, word.b)
+        if not symbol.strip("."):
+            return None
+        return _lookup_docs(symbol)
+
+    def on_hover(self, view, point, hover_zone):
+        if hover_zone != sublime.HOVER_TEXT or not self.is_mxs(view):
+            return
+        record = self.lookup(view, point)
+        # Without a .docs file there is nothing to show but the name.
+        if record is None or record[1] == record[0]:
+            return
+        symbol, signature, description = record
+        content = ("<b>{0}</b><br>{1}<br><a href=\"{2}\">Open help</a>"
+                   .format(html.escape(signature), html.escape(description),
+                           html.escape(symbol)))
+
+        def on_navigate(keyword):
+            webbrowser.open(_get_query_help_url(keyword),
+                            new=0, autoraise=True)
+
+        view.show_popup(content, sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+                        point, 600, 300, on_navigate)
+
+    def on_selection_modified_async(self, view):
+        if not self.is_mxs(view) or len(view.sel()) != 1:
+            return
+        point = view.sel()[0].b
+        # Only hint right behind a word, e.g. after typing 'polyop.getVert '.
+        before = view.substr(sublime.Region(max(0, point - 1), point))
+        record = None
+        if before.isspace():
+            record = self.lookup(view, point - 1)
+        if record is not None and record[1] != record[0]:
+            view.set_status(self.status_key, record[1])
+        else:
+            view.erase_status(self.status_key)
 
 
 def plugin_unloaded():
     """Perform cleanup work."""
-    if os.path.isfile(constants.TEMPFILE):
-        try:
-            os.remove(constants.TEMPFILE)
-        except OSError:
-            pass
+    completionworker.worker.shutdown()
+    send_queue.shutdown()
+    output_poller.stop()
+    if current_transport is not None:
+        current_transport.close()
+    for target in window_transports.values():
+        target.close()
+    with doc_index_lock:
+        if doc_index is not None:
+            doc_index.close()
+    temp_store.clear()
@@ -0,0 +1,218 @@
+"""Index of the MAXScript definitions of all scripts in a workspace.
+
+Top-level functions, structs with their members, rollouts, macroScripts
+etc. of every script below the folders of a Sublime window, used for go
+to definition and completion. The index is persisted and files are
+parsed again only if their mtime or size changed.
+"""
+from __future__ import unicode_literals
+
+import marshal
+import os
+import re
+import threading
+
+from concurrent import futures
+
+from . import apiindex
+from . import mxsblocks
+
+
+# Bump when the layout of the dumped index changes.
+CACHE_FORMAT = 2
+
+SCRIPT_EXTENSIONS = (".ms", ".mcr", ".mse")
+
+MEMBER_RE = re.compile(
+    r"(?:(?:public|private)\s+)?"
+    r"(?:(?:mapped\s+)?(?:fn|function)\s+(\w+)|([A-Za-z_]\w*)\s*(?:=|,|$))",
+    re.I)
+
+KEYWORDS = frozenset(["public", "private"])
+
+
+def _get_members(block):
+    """Return the (name, kind, line, container) of a struct's members."""
+    members = []
+    lines = mxsblocks.scan_lines(block.text)
+    for offset, (depth, state, code) in enumerate(lines):
+        if depth != 1 or state != mxsblocks.CODE:
+            continue
+        match = MEMBER_RE.match(code)
+        if match is None:
+            continue
+        function, variable = match.groups()
+        if function:
+            members.append((function, "fn", block.start + offset,
+                            block.name))
+        elif variable.lower() not in KEYWORDS:
+            members.append((variable, "member", block.start + offset,
+                            block.name))
+    return members
+
+
+def extract_symbols(text):
+    """Return (name, kind, line, container) of the definitions in text.
+
+    line is zero-based, container is the struct of a member or None.
+    """
+    symbols = []
+    for block in mxsblocks.split_blocks(text):
+        if block.kind is None:
+            continue
+        symbols.append((block.name, block.kind, block.start, None))
+        if block.kind == "struct":
+            symbols.extend(_get_members(block))
+    return symbols
+
+
+def find_scripts(folders):
+    """Return the paths of all scripts below folders, skipping dotfolders."""
+    paths = []
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            paths.extend(os.path.join(root, name) for name in files
+                         if name.lower().endswith(SCRIPT_EXTENSIONS))
+    return paths
+
+
+def _parse_file(path):
+    """Return (path, mtime, size, symbols) or None if unreadable."""
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            text = f.read().decode("utf-8", "replace")
+    except (IOError, OSError):
+        return None
+    return path, stat.st_mtime, stat.st_size, extract_symbols(text)
+
+
+class SymbolIndex(object):
+    """Symbols of the scripts below some folders, by lowercase name."""
+
+    def __init__(self, folders, files=None):
+        self.folders = list(folders)
+        self.lock = threading.Lock()
+        # Maps paths to (mtime, size, symbols).
+        self.files = files or {}
+        self._build()
+
+    def _build(self):
+        with self.lock:
+            files = dict(self.files)
+        symbols = {}
+        for path, (_, _, entries) in files.items():
+            for entry in entries:
+                symbols.setdefault(entry[0].lower(), []).append(
+                    (path,) + tuple(entry))
+        # Completion only offers definitions that are visible globally.
+        names = apiindex.ApiIndex(entry[1] for entries in symbols.values()
+                                  for entry in entries if entry[4] is None)
+        self.symbols, self.names = symbols, names
+
+    def update(self, max_workers=4):
+        """Re-index the files that changed since the last update.
+
+        Returns the number of files parsed.
+        """
+        paths = find_scripts(self.folders)
+        with self.lock:
+            files = dict(self.files)
+        changed = []
+        current = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = files.get(path)
+            if entry is not None and \
+                    (entry[0], entry[1]) == (stat.st_mtime, stat.st_size):
+                current[path] = entry
+            else:
+                changed.append(path)
+        if changed:
+            with futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for result in pool.map(_parse_file, changed):
+                    if result is not None:
+                        current[result[0]] = result[1:]
+        with self.lock:
+            self.files = current
+        self._build()
+        return len(changed)
+
+    def update_file(self, path):
+        """Re-index a single file, e.g. after it was saved."""
+        result = _parse_file(path)
+        with self.lock:
+            if result is None:
+                self.files.pop(path, None)
+            else:
+                self.files[path] = result[1:]
+        self._build()
+
+    def contains(self, path):
+        """Return if path lies below one of the indexed folders."""
+        path = os.path.normcase(os.path.abspath(path))
+        for folder in self.folders:
+            folder = os.path.join(os.path.normcase(os.path.abspath(folder)),
+                                  "")
+            if path.startswith(folder):
+                return True
+        return False
+
+    def find(self, name):
+        """Return (path, name, kind, line, container) of definitions."""
+        return list(self.symbols.get(name.lower(), ()))
+
+    def dump(self):
+        """Return the index as plain, marshallable data."""
+        with self.lock:
+            return {"folders": self.folders,
+                    "files": dict((path, list(entry))
+                                  for path, entry in self.files.items())}
+
+    @classmethod
+    def restore(cls, data):
+        files = dict((path, (mtime, size, [tuple(symbol)
+                                           for symbol in symbols]))
+                     for path, (mtime, size, symbols)
+                     in data["files"].items())
+        return cls(data["folders"], files)
+
+
+def load_cache(cachefile, folders):
+    """Return the SymbolIndex of folders stored in cachefile or None."""
+    try:
+        with open(cachefile, "rb") as f:
+            data = marshal.loads(f.read())
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if data.get("format") != CACHE_FORMAT:
+        return None
+    if data.get("folders") != list(folders):
+        return None
+    try:
+        return SymbolIndex.restore(data)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def save_cache(cachefile, index):
+    """Write index to cachefile."""
+    data = index.dump()
+    data["format"] = CACHE_FORMAT
+    tmpfile = cachefile + ".tmp"
+    try:
+        cachedir = os.path.dirname(cachefile)
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        with open(tmpfile, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmpfile, cachefile)
+    except (IOError, OSError, ValueError):
+        # A missing cache only costs us a full scan, so never fail.
+        pass
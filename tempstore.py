@@ -0,0 +1,130 @@
+"""Temporary script files for code that 3ds Max imports via fileIn."""
+from __future__ import unicode_literals
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+
+
+class TempStore(object):
+    """Temporary files named after a hash of their content.
+
+    Sending the same code again reuses its file instead of rewriting it,
+    and different code never overwrites a file that a send waiting in
+    the queue still refers to. Only the maxfiles most recently used
+    files are kept, older ones are deleted. So are files named obsolete,
+    e.g. written by an older version, once the store is first used.
+    """
+
+    def __init__(self, directory, prefix, maxfiles, obsolete=()):
+        self.directory = directory
+        self.prefix = prefix
+        self.maxfiles = maxfiles
+        self.obsolete = obsolete
+        self.lock = threading.Lock()
+        self.files = None
+
+    def _load(self):
+        """Pick up files left over by a previous session, oldest first."""
+        self.files = collections.OrderedDict()
+        for name in self.obsolete:
+            self._remove(os.path.join(self.directory, name))
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        found = []
+        for name in names:
+            if not name.startswith(self.prefix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                found.append((os.path.getmtime(path), name, path))
+            except OSError:
+                pass
+        for _, name, path in sorted(found):
+            self.files[name] = path
+
+    def get_path(self, text, extension):
+        """Return the path of a file containing text, writing it if needed.
+
+        Raises OSError if the file could not be written.
+        """
+        data = text.encode("utf-8")
+        name = "{0}{1}{2}".format(
+            self.prefix, hashlib.sha1(data).hexdigest()[:16], extension)
+        with self.lock:
+            if self.files is None:
+                self._load()
+            path = self.files.pop(name, None)
+            if path is None or not os.path.isfile(path):
+                path = self._write(name, data)
+            self.files[name] = path
+            self._evict()
+        return path
+
+    def get_path_streamed(self, chunks, extension):
+        """Like get_path() for text given as an iterable of chunks.
+
+        Each chunk is written as it comes and the file is named after its
+        hash once complete, so the text is never held in memory as a
+        whole. Raises OSError if the file could not be written.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        handle, tmp = tempfile.mkstemp(prefix=self.prefix, suffix=".tmp",
+                                       dir=self.directory)
+        try:
+            digest = hashlib.sha1()
+            with os.fdopen(handle, "wb") as f:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8")
+                    digest.update(data)
+                    f.write(data)
+            name = "{0}{1}{2}".format(
+                self.prefix, digest.hexdigest()[:16], extension)
+            with self.lock:
+                if self.files is None:
+                    self._load()
+                path = self.files.pop(name, None)
+                if path is None or not os.path.isfile(path):
+                    path = os.path.join(self.directory, name)
+                    os.replace(tmp, path)
+                self.files[name] = path
+                self._evict()
+        finally:
+            if os.path.exists(tmp):
+                self._remove(tmp)
+        return path
+
+    def _write(self, name, data):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = os.path.join(self.directory, name)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+    def _evict(self):
+        while len(self.files) > self.maxfiles:
+            _, path = self.files.popitem(last=False)
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Delete all files of the store."""
+        with self.lock:
+            if self.files is None:
+                self._load()
+            for path in self.files.values():
+                self._remove(path)
+            self.files.clear()
@@ -0,0 +1,239 @@
+"""Run MAXScript regression tests sharded across 3ds Max instances.
+
+Every test script is wrapped into a small MAXScript that clears the
+AssertReporter, runs the script with fileIn and writes the collected
+assert failures and messages to a result file, which is read back once
+the send returned. Scripts are split into one shard per instance up
+front; an instance that is done with its shard takes over the remaining
+work of the busiest one.
+"""
+from __future__ import unicode_literals
+
+import collections
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from . import transport
+
+
+TEST_EXTENSIONS = (".ms",)
+
+# Markers in the wrapper, so a stand-in 3ds Max can tell what to run.
+TEST_MARKER = "-- sublime3dsmax test: "
+RESULT_MARKER = "-- sublime3dsmax result: "
+
+WRAPPER = """{test_marker}{script}
+{result_marker}{resultfile}
+(
+    AssertReporter.Clear()
+    local _error = undefined
+    try (fileIn @"{script}") catch (_error = getCurrentException())
+    local _file = createFile @"{resultfile}"
+    fn _clean text = substituteString (text as string) "\\n" " "
+    if _error != undefined do format "error\\t%\\n" (_clean _error) to:_file
+    for _m in AssertReporter.GetAssertFailures() do
+        format "failure\\t%\\n" (_clean _m) to:_file
+    for _m in AssertReporter.GetMessages() do
+        format "message\\t%\\n" (_clean _m) to:_file
+    close _file
+)
+"""
+
+
+def find_tests(directory):
+    """Return the paths of all test scripts below directory, sorted."""
+    scripts = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in TEST_EXTENSIONS:
+                scripts.append(os.path.join(root, name))
+    return scripts
+
+
+def make_wrapper(script, resultfile):
+    return WRAPPER.format(test_marker=TEST_MARKER, result_marker=RESULT_MARKER,
+                          script=script, resultfile=resultfile)
+
+
+class TestResult(object):
+    """Outcome of one test script on one 3ds Max instance."""
+
+    def __init__(self, script, instance, failures=(), messages=(),
+                 error=None, seconds=0.0):
+        self.script = script
+        self.instance = instance
+        self.failures = list(failures)
+        self.messages = list(messages)
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None and not self.failures
+
+
+def parse_result(text):
+    """Return (failures, messages, error) from the text of a result file."""
+    failures, messages, errors = [], [], []
+    kinds = {"failure": failures, "message": messages, "error": errors}
+    for line in text.splitlines():
+        kind, _, value = line.partition("\t")
+        if kind in kinds:
+            kinds[kind].append(value)
+    return failures, messages, "; ".join(errors) or None
+
+
+def _get_cost(script):
+    try:
+        return os.path.getsize(script)
+    except OSError:
+        return 0
+
+
+class TestRunner(object):
+    """Run test scripts on several 3ds Max instances in parallel.
+
+    targets is a list of (name, transport). Shards are balanced by file
+    size as a rough estimate of the run time. on_result is called with
+    each TestResult as soon as it is known, from the worker threads.
+    """
+
+    def __init__(self, targets, on_result=None):
+        self.targets = targets
+        self.on_result = on_result
+        self.lock = threading.Lock()
+        self.shards = []
+        self.alive = 0
+        self.results = []
+
+    def _make_shards(self, scripts):
+        """Split scripts into one shard per target, largest first."""
+        shards = [collections.deque() for _ in self.targets]
+        loads = [0] * len(self.targets)
+        for cost, script in sorted(((_get_cost(script), script)
+                                    for script in scripts), reverse=True):
+            index = loads.index(min(loads))
+            shards[index].append(script)
+            loads[index] += cost
+        return shards
+
+    def _next_script(self, index):
+        """Pop the next script of a shard or steal one from the fullest."""
+        with self.lock:
+            if self.shards[index]:
+                return self.shards[index].popleft()
+            fullest = max(self.shards, key=len)
+            if fullest:
+                return fullest.pop()
+            # Done, dying instances can no longer hand work to this one.
+            self.alive -= 1
+            return None
+
+    def _add_result(self, result):
+        with self.lock:
+            self.results.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def run_script(self, name, target, script, workdir, number):
+        """Run one test script via target and return its TestResult.
+
+        Raises transport.TransportError if the instance is unusable.
+        """
+        resultfile = os.path.join(workdir, "{0}.result".format(number))
+        wrapperfile = os.path.join(workdir, "{0}.ms".format(number))
+        with open(wrapperfile, "w") as f:
+            f.write(make_wrapper(script, resultfile))
+
+        start = time.time()
+        target.send_command('fileIn @"{0}"\r\n'.format(wrapperfile))
+        seconds = time.time() - start
+        try:
+            with open(resultfile, "rb") as f:
+                text = f.read().decode("utf-8", "replace")
+        except (IOError, OSError):
+            return TestResult(script, name, error="No result written",
+                              seconds=seconds)
+        failures, messages, error = parse_result(text)
+        return TestResult(script, name, failures, messages, error, seconds)
+
+    def _work(self, index, workdir, numbers):
+        """Run scripts on one target until there are none left."""
+        name, target = self.targets[index]
+        while True:
+            script = self._next_script(index)
+            if script is None:
+                break
+            try:
+                result = self.run_script(name, target, script, workdir,
+                                         numbers[script])
+            except transport.TransportError as e:
+                # Give the script back to the instances still running.
+                with self.lock:
+                    self.shards[index].appendleft(script)
+                    self.alive -= 1
+                    is_last = self.alive == 0
+                if is_last:
+                    self._abandon("{0} failed: {1}".format(
+                        name, str(e) or e.__class__.__name__))
+                return
+            self._add_result(result)
+
+    def _abandon(self, reason):
+        """Report every script left over once no instance is usable."""
+        with self.lock:
+            left = [script for shard in self.shards for script in shard]
+            for shard in self.shards:
+                shard.clear()
+        for script in left:
+            self._add_result(TestResult(script, None, error=reason))
+
+    def run(self, scripts):
+        """Run all scripts and return their results in script order."""
+        self.shards = self._make_shards(scripts)
+        self.alive = len(self.targets)
+        self.results = []
+        numbers = dict((script, number)
+                       for number, script in enumerate(scripts))
+        workdir = tempfile.mkdtemp(prefix="sublime3dsmax-tests-")
+        try:
+            threads = []
+            for index in range(len(self.targets)):
+                thread = threading.Thread(target=self._work,
+                                          args=(index, workdir, numbers))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if not self.targets:
+            self._abandon("No 3ds Max instance found")
+        return sorted(self.results, key=lambda result: numbers[result.script])
+
+
+def format_result(result):
+    """Return the lines reporting a single test script."""
+    status = "PASS" if result.ok else ("ERROR" if result.error else "FAIL")
+    lines = ["{0:<6}{1} ({2:.2f}s, {3})".format(
+        status, result.script, result.seconds, result.instance or "-")]
+    if result.error:
+        lines.append("      {0}".format(result.error))
+    for failure in result.failures:
+        lines.append("      {0}".format(failure))
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(results, seconds):
+    failed = sum(1 for result in results if result.failures and
+                 not result.error)
+    errors = sum(1 for result in results if result.error)
+    return ("{0} tests in {1:.1f}s: {2} passed, {3} failed, "
+            "{4} errors\n").format(len(results), seconds,
+                                   len(results) - failed - errors, failed,
+                                   errors)
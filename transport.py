@@ -0,0 +1,265 @@
+"""Ways of delivering code to a 3ds Max instance.
+
+Win32Transport types commands into the mini macrorecorder of a 3ds Max
+window. SocketTransport talks to max/sublime3dsmax_listener.py running
+inside 3ds Max and can send whole scripts without a temporary file.
+"""
+from __future__ import unicode_literals
+
+import json
+import socket
+import struct
+import threading
+
+from . import listeneroutput
+
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 256 * 1024 * 1024
+
+# Locks of the 3ds Max windows by handle, several transports may type
+# into the same window at once, e.g. a send and a test run.
+window_locks = {}
+window_locks_lock = threading.Lock()
+
+
+def get_window_lock(handle):
+    with window_locks_lock:
+        if handle not in window_locks:
+            window_locks[handle] = threading.Lock()
+        return window_locks[handle]
+
+
+class TransportError(Exception):
+    """Base class for failures to deliver code to 3ds Max."""
+
+
+class MaxNotFoundError(TransportError):
+    """The targeted 3ds Max instance is gone or not reachable."""
+
+
+class RecorderNotFoundError(TransportError):
+    """The 3ds Max window has no mini macrorecorder we could type into."""
+
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise EOFError("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    """Read one length-prefixed JSON message."""
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    if size > MAX_FRAME:
+        raise ValueError("Frame too large: {0}".format(size))
+    return json.loads(recv_exactly(sock, size).decode("utf-8"))
+
+
+def send_frame(sock, message):
+    """Write one length-prefixed JSON message."""
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+class Transport(object):
+    """Delivers code to one 3ds Max instance.
+
+    Every transport can evaluate a single MAXScript command line. Those
+    with supports_code set can also evaluate whole MAXScript or Python
+    scripts directly, otherwise callers go through a temporary file.
+    """
+    supports_code = False
+
+    def send_command(self, cmd):
+        """Evaluate a single line of MAXScript."""
+        raise NotImplementedError
+
+    def send_code(self, code, language):
+        """Evaluate code of language 'maxscript' or 'python'.
+
+        Returns the reply of 3ds Max as dict with 'ok', 'result' and
+        'output' keys.
+        """
+        raise NotImplementedError
+
+    def is_alive(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class Win32Transport(Transport):
+    """Type commands into the mini macrorecorder of a 3ds Max window.
+
+    The macrorecorder control is remembered together with its parent
+    and only searched for again when it fails a cheap validity check.
+    """
+
+    def __init__(self, window, winapi):
+        self.window = window
+        self.winapi = winapi
+        self.recorder = None
+        self.is_legacy = False
+        self.tail = None
+        # The recorder the Listener output was last searched next to, so
+        # a window without one is not searched again on every send.
+        self.tail_recorder = None
+
+    def _find_recorder(self):
+        """Search the children of the window for the mini macrorecorder.
+
+        Return a tuple of the control (or None) and whether it is the rich
+        edit box of an ancient Max version instead of a Scintilla control.
+        """
+        recorder = self.window.find_child(text=None, cls="MXS_Scintilla")
+        if recorder is not None:
+            return recorder, False
+        # If the mini macrorecorder was not found, there is still a chance
+        # we are targetting an ancient Max version (e.g. 9) where the
+        # listener was not Scintilla based, but instead a rich edit box.
+        statuspanel = self.window.find_child(text=None, cls="StatusPanel")
+        if statuspanel is None:
+            return None, False
+        return statuspanel.find_child(text=None, cls="RICHEDIT"), True
+
+    def _is_recorder_valid(self):
+        if self.recorder is None:
+            return False
+        try:
+            if not self.recorder.is_child_of(self.window):
+                return False
+            # Guard against the handle having been reused by another window.
+            expected = "RICHEDIT" if self.is_legacy else "MXS_Scintilla"
+            return expected in self.recorder.get_classname()
+        except (OSError, ValueError):
+            return False
+
+    def get_recorder(self):
+        """Return the (control, is_legacy) of the mini macrorecorder."""
+        if not self._is_recorder_valid():
+            self.recorder = None
+            if not self.window.is_valid():
+                raise MaxNotFoundError("Invalid window handle")
+            try:
+                recorder, is_legacy = self._find_recorder()
+            except OSError:
+                raise MaxNotFoundError("Invalid window handle")
+            if recorder is None:
+                raise RecorderNotFoundError()
+            self.recorder, self.is_legacy = recorder, is_legacy
+        return self.recorder, self.is_legacy
+
+    def is_alive(self):
+        return self.window.is_valid()
+
+    def get_output_tail(self):
+        """Return a ScintillaTail on the Listener output or None."""
+        recorder, _ = self.get_recorder()
+        if self.tail is None and self.tail_recorder is not recorder:
+            self.tail_recorder = recorder
+            try:
+                control = listeneroutput.find_listener_output(recorder)
+                if control is not None:
+                    self.tail = listeneroutput.ScintillaTail(control,
+                                                             self.winapi)
+            except OSError:
+                raise MaxNotFoundError("Invalid window handle")
+        return self.tail
+
+    def close(self):
+        if self.tail is not None:
+            self.tail.close()
+            self.tail = None
+        self.tail_recorder = None
+
+    def send_command(self, cmd):
+        """Type cmd into the mini macrorecorder and press return."""
+        recorder, is_legacy = self.get_recorder()
+        if is_legacy:
+            # Verbatim strings (the @ at sign) are also not yet supported.
+            cmd = cmd.replace("@", "")
+            cmd = cmd.replace("\\", "\\\\")
+        cmd = cmd.encode("utf-8")  # Needed for ST3!
+        # Another command typed in between would replace this one.
+        with get_window_lock(self.window.get_handle()):
+            recorder.send(self.winapi.WM_SETTEXT, 0, cmd)
+            recorder.send(self.winapi.WM_CHAR, self.winapi.VK_RETURN, 0)
+
+
+class SocketTransport(Transport):
+    """Send code to the listener server running inside 3ds Max."""
+    supports_code = True
+
+    def __init__(self, host, port, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port),
+                                            self.timeout)
+        except (socket.error, OSError) as e:
+            raise MaxNotFoundError(
+                "No listener on {0}:{1}: {2}".format(self.host, self.port, e))
+        sock.settimeout(self.timeout)
+        return sock
+
+    def _request(self, message):
+        if self.sock is None:
+            self.sock = self._connect()
+        send_frame(self.sock, message)
+        return recv_frame(self.sock)
+
+    def request(self, message):
+        """Send message and return the reply, reconnecting once if needed."""
+        with self.lock:
+            reused = self.sock is not None
+            try:
+                return self._request(message)
+            except socket.timeout:
+                # The code may well be running, never send it twice.
+                self.close()
+                raise TransportError("Timed out waiting for 3ds Max")
+            except (socket.error, OSError, EOFError) as e:
+                self.close()
+                if not reused:
+                    raise MaxNotFoundError(str(e))
+            # The kept connection was stale, e.g. 3ds Max was restarted.
+            try:
+                return self._request(message)
+            except (socket.error, OSError, EOFError) as e:
+                self.close()
+                raise MaxNotFoundError(str(e))
+
+    def is_alive(self):
+        try:
+            with self.lock:
+                if self.sock is None:
+                    self.sock = self._connect()
+            return True
+        except MaxNotFoundError:
+            return False
+
+    def send_command(self, cmd):
+        return self.send_code(cmd, "maxscript")
+
+    def send_code(self, code, language):
+        return self.request({"language": language, "code": code})
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except (socket.error, OSError):
+                pass
+            self.sock = None
@@ -34,6 +34,8 @@ from __future__ import (print_function, absolute_import,
                         unicode_literals, with_statement)
 
 import ctypes
+import itertools
+import threading
 
 LPVOID = ctypes.c_void_p
 CHAR = ctypes.c_char
@@ -81,8 +83,13 @@ SIZEOF = ctypes.sizeof
 POINTER = ctypes.POINTER
 Structure = ctypes.Structure
 Union = ctypes.Union
-WINFUNCTYPE = ctypes.WINFUNCTYPE
-windll = ctypes.windll
+try:
+    WINFUNCTYPE = ctypes.WINFUNCTYPE
+    windll = ctypes.windll
+except AttributeError:
+    # Not on Windows, only a simulated backend can be used, see fakewin.
+    WINFUNCTYPE = ctypes.CFUNCTYPE
+    windll = None
 WNDENUMPROC = WINFUNCTYPE(BOOL, HWND, PVOID)
 NULL = None
 INFINITE = -1
@@ -94,12 +101,151 @@ LRESULT = LPVOID
 ERROR_SUCCESS = 0
 ERROR_NO_MORE_FILES = 18
 
+SIZE_T = ctypes.c_size_t
+
+PROCESS_VM_OPERATION = 0x0008
+PROCESS_VM_READ = 0x0010
+PROCESS_VM_WRITE = 0x0020
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+MEM_COMMIT = 0x1000
+MEM_RESERVE = 0x2000
+MEM_RELEASE = 0x8000
+PAGE_READWRITE = 0x04
+
 WM_SETTEXT = 0x000C
 WM_KEYDOWN = 0x0100
 WM_KEYUP = 0x0101
 WM_CHAR = 0x0102  # The alternative to WM_KEYDOWN
 VK_RETURN = 0x0D  # Enter key
 
+SCI_GETLENGTH = 2006
+SCI_GETTEXTRANGE = 2162
+
+_chain = itertools.chain
+
+
+def RaiseIfZero(result, func=None, arguments=()):
+    """
+    Error checking for most Win32 API calls.
+
+    The function is assumed to return an integer, which is C{0} on error.
+    In that case the C{WindowsError} exception is raised.
+    """
+    if not result:
+        raise ctypes.WinError()
+    return result
+
+
+def _bind(dll, name, argtypes, restype, errcheck=None):
+    """
+    Look up an API function and set up its prototype.
+
+    Done once at import time for every function we use, instead of
+    each time a wrapper is called.
+    """
+    if dll is None:
+        return _unavailable(name)
+    function = getattr(dll, name)
+    function.argtypes = argtypes
+    function.restype = restype
+    if errcheck is not None:
+        function.errcheck = errcheck
+    return function
+
+
+def _unavailable(name):
+    def function(*argv):
+        raise OSError("{0} is only available on Windows".format(name))
+    return function
+
+
+_user32 = windll.user32 if windll is not None else None
+_kernel32 = windll.kernel32 if windll is not None else None
+
+_GetLastError = _bind(_kernel32, "GetLastError", [], DWORD)
+_SetLastError = _bind(_kernel32, "SetLastError", [DWORD], None)
+_EnumWindows = _bind(_user32, "EnumWindows", [WNDENUMPROC, LPARAM], bool)
+_EnumChildWindows = _bind(_user32, "EnumChildWindows",
+                          [HWND, WNDENUMPROC, LPARAM], bool)
+_GetWindowTextA = _bind(_user32, "GetWindowTextA",
+                        [HWND, LPSTR, ctypes.c_int], ctypes.c_int)
+_GetWindowTextW = _bind(_user32, "GetWindowTextW",
+                        [HWND, LPWSTR, ctypes.c_int], ctypes.c_int)
+_GetClassNameA = _bind(_user32, "GetClassNameA",
+                       [HWND, LPSTR, ctypes.c_int], ctypes.c_int)
+_GetClassNameW = _bind(_user32, "GetClassNameW",
+                       [HWND, LPWSTR, ctypes.c_int], ctypes.c_int)
+_SetWindowTextA = _bind(_user32, "SetWindowTextA", [HWND, LPSTR], bool,
+                        RaiseIfZero)
+_SetWindowTextW = _bind(_user32, "SetWindowTextW", [HWND, LPWSTR], bool,
+                        RaiseIfZero)
+_SendMessageA = _bind(_user32, "SendMessageA",
+                      [HWND, UINT, WPARAM, LPARAM], LRESULT)
+_SendMessageW = _bind(_user32, "SendMessageW",
+                      [HWND, UINT, WPARAM, LPARAM], LRESULT)
+_IsWindow = _bind(_user32, "IsWindow", [HWND], bool)
+_IsChild = _bind(_user32, "IsChild", [HWND, HWND], bool)
+_GetParent = _bind(_user32, "GetParent", [HWND], HWND)
+_FindWindowA = _bind(_user32, "FindWindowA", [LPSTR, LPSTR], HWND)
+_FindWindowW = _bind(_user32, "FindWindowW", [LPWSTR, LPWSTR], HWND)
+_GetWindowThreadProcessId = _bind(_user32, "GetWindowThreadProcessId",
+                                  [HWND, POINTER(DWORD)], DWORD)
+_OpenProcess = _bind(_kernel32, "OpenProcess", [DWORD, BOOL, DWORD], HANDLE)
+_CloseHandle = _bind(_kernel32, "CloseHandle", [HANDLE], bool)
+_QueryFullProcessImageNameW = _bind(
+    _kernel32, "QueryFullProcessImageNameW",
+    [HANDLE, DWORD, LPWSTR, POINTER(DWORD)], bool)
+_VirtualAllocEx = _bind(_kernel32, "VirtualAllocEx",
+                        [HANDLE, LPVOID, SIZE_T, DWORD, DWORD], LPVOID,
+                        RaiseIfZero)
+_VirtualFreeEx = _bind(_kernel32, "VirtualFreeEx",
+                       [HANDLE, LPVOID, SIZE_T, DWORD], bool, RaiseIfZero)
+_ReadProcessMemory = _bind(_kernel32, "ReadProcessMemory",
+                           [HANDLE, LPVOID, LPVOID, SIZE_T, POINTER(SIZE_T)],
+                           bool, RaiseIfZero)
+_WriteProcessMemory = _bind(_kernel32, "WriteProcessMemory",
+                            [HANDLE, LPVOID, LPVOID, SIZE_T, POINTER(SIZE_T)],
+                            bool, RaiseIfZero)
+
+
+class _BufferPool(threading.local):
+    """
+    Per-thread text buffers, reused by the text getters.
+
+    Buffers only ever grow, the getters read out .value right away so
+    no caller holds on to a buffer.
+    """
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, factory, nMaxCount):
+        buffer = self.buffers.get(factory)
+        if buffer is None or len(buffer) < nMaxCount:
+            buffer = self.buffers[factory] = factory(nMaxCount)
+        return buffer
+
+
+_buffers = _BufferPool()
+
+
+def _get_text(function, factory, dwCharSize, hWnd):
+    """
+    Call a GetWindowText or GetClassName style function with a pooled
+    buffer, growing it until the text fits.
+    """
+    nMaxCount = 0x1000
+    while 1:
+        lpString = _buffers.get(factory, nMaxCount)
+        nMaxCount = len(lpString)
+        nCount = function(hWnd, lpString, nMaxCount)
+        if nCount == 0:
+            raise ctypes.WinError()
+        if nCount < nMaxCount - dwCharSize:
+            break
+        nMaxCount += 0x1000
+    return lpString.value
+
 
 class GuessStringType(object):
     """
@@ -158,52 +304,33 @@ class GuessStringType(object):
 
     def __call__(self, *argv, **argd):
 
-        # Shortcut to self.t_ansi
+        # Only look at the argument types until the first string, this
+        # is called for every window during enumeration.
         t_ansi = self.t_ansi
-
-        # Get the types of all arguments for the function
-        v_types = [type(item) for item in argv]
-        v_types.extend([type(value) for (key, value) in argd.items()])
-
-        # Get the appropriate function for the default type
-        if self.t_default == t_ansi:
-            fn = self.fn_ansi
-        else:
-            fn = self.fn_unicode
-
-        # If at least one argument is a Unicode string...
-        if self.t_unicode in v_types:
-
-            # If al least one argument is an ANSI string,
-            # convert all ANSI strings to Unicode
-            if t_ansi in v_types:
-                argv = list(argv)
-                for index in range(len(argv)):
-                    if v_types[index] == t_ansi:
-                        argv[index] = (argv[index])
-                for (key, value) in argd.items():
-                    if type(value) == t_ansi:
-                        argd[key] = (value)
-
-            # Use the W version
-            fn = self.fn_unicode
+        t_unicode = self.t_unicode
+        has_ansi = False
+        for item in _chain(argv, argd.values()):
+            t_item = type(item)
+            # If at least one argument is a Unicode string,
+            # use the W version
+            if t_item is t_unicode:
+                return self.fn_unicode(*argv, **argd)
+            if t_item is t_ansi:
+                has_ansi = True
 
         # If at least one argument is an ANSI string,
-        # but there are no Unicode strings...
-        elif t_ansi in v_types:
-
-            # Use the A version
-            fn = self.fn_ansi
+        # but there are no Unicode strings, use the A version
+        if has_ansi:
+            return self.fn_ansi(*argv, **argd)
 
-        # Call the function and return the result
-        return fn(*argv, **argd)
+        # Otherwise the appropriate function for the default type
+        if self.t_default == t_ansi:
+            return self.fn_ansi(*argv, **argd)
+        return self.fn_unicode(*argv, **argd)
 
 
 # DWORD WINAPI GetLastError(void);
 def GetLastError():
-    _GetLastError = windll.kernel32.GetLastError
-    _GetLastError.argtypes = []
-    _GetLastError.restype = DWORD
     return _GetLastError()
 
 
@@ -211,9 +338,6 @@ def GetLastError():
 #   __in  DWORD dwErrCode
 # );
 def SetLastError(dwErrCode):
-    _SetLastError = windll.kernel32.SetLastError
-    _SetLastError.argtypes = [DWORD]
-    _SetLastError.restype = None
     _SetLastError(dwErrCode)
 
 
@@ -258,10 +382,6 @@ class __EnumWndProc (__WindowEnumerator):
 # stuff for finding and analyzing UI Elements
 # EnumWindows = ctypes.windll.user32.EnumWindows
 def EnumWindows():
-    _EnumWindows = windll.user32.EnumWindows
-    _EnumWindows.argtypes = [WNDENUMPROC, LPARAM]
-    _EnumWindows.restype = bool
-
     EnumFunc = __EnumWndProc()
     lpEnumFunc = WNDENUMPROC(EnumFunc)
     if not _EnumWindows(lpEnumFunc, NULL):
@@ -285,10 +405,6 @@ class __EnumChildProc (__WindowEnumerator):
 #     LPARAM lParam
 # );
 def EnumChildWindows(hWndParent=NULL):
-    _EnumChildWindows = windll.user32.EnumChildWindows
-    _EnumChildWindows.argtypes = [HWND, WNDENUMPROC, LPARAM]
-    _EnumChildWindows.restype = bool
-
     EnumFunc = __EnumChildProc()
     lpEnumFunc = WNDENUMPROC(EnumFunc)
     SetLastError(ERROR_SUCCESS)
@@ -306,39 +422,13 @@ def EnumChildWindows(hWndParent=NULL):
 #   __in   int nMaxCount
 # );
 def GetWindowTextA(hWnd):
-    _GetWindowTextA = windll.user32.GetWindowTextA
-    _GetWindowTextA.argtypes = [HWND, LPSTR, ctypes.c_int]
-    _GetWindowTextA.restype = ctypes.c_int
-
-    nMaxCount = 0x1000
-    dwCharSize = sizeof(CHAR)
-    while 1:
-        lpString = ctypes.create_string_buffer(nMaxCount)
-        nCount = _GetWindowTextA(hWnd, lpString, nMaxCount)
-        if nCount == 0:
-            raise ctypes.WinError()
-        if nCount < nMaxCount - dwCharSize:
-            break
-        nMaxCount += 0x1000
-    return str(lpString.value)
+    return str(_get_text(_GetWindowTextA, ctypes.create_string_buffer,
+                         sizeof(CHAR), hWnd))
 
 
 def GetWindowTextW(hWnd):
-    _GetWindowTextW = windll.user32.GetWindowTextW
-    _GetWindowTextW.argtypes = [HWND, LPWSTR, ctypes.c_int]
-    _GetWindowTextW.restype = ctypes.c_int
-
-    nMaxCount = 0x1000
-    dwCharSize = sizeof(CHAR)
-    while 1:
-        lpString = ctypes.create_string_buffer(nMaxCount)
-        nCount = _GetWindowTextW(hWnd, lpString, nMaxCount)
-        if nCount == 0:
-            raise ctypes.WinError()
-        if nCount < nMaxCount - dwCharSize:
-            break
-        nMaxCount += 0x1000
-    return str(lpString.value)
+    return _get_text(_GetWindowTextW, ctypes.create_unicode_buffer,
+                     sizeof(WCHAR), hWnd)
 
 GetWindowText = GuessStringType(GetWindowTextA, GetWindowTextW)
 
@@ -349,39 +439,13 @@ GetWindowText = GuessStringType(GetWindowTextA, GetWindowTextW)
 #     int nMaxCount
 # );
 def GetClassNameA(hWnd):
-    _GetClassNameA = windll.user32.GetClassNameA
-    _GetClassNameA.argtypes = [HWND, LPSTR, ctypes.c_int]
-    _GetClassNameA.restype = ctypes.c_int
-
-    nMaxCount = 0x1000
-    dwCharSize = sizeof(CHAR)
-    while 1:
-        lpClassName = ctypes.create_string_buffer(nMaxCount)
-        nCount = _GetClassNameA(hWnd, lpClassName, nMaxCount)
-        if nCount == 0:
-            raise ctypes.WinError()
-        if nCount < nMaxCount - dwCharSize:
-            break
-        nMaxCount += 0x1000
-    return str(lpClassName.value)
+    return str(_get_text(_GetClassNameA, ctypes.create_string_buffer,
+                         sizeof(CHAR), hWnd))
 
 
 def GetClassNameW(hWnd):
-    _GetClassNameW = windll.user32.GetClassNameW
-    _GetClassNameW.argtypes = [HWND, LPWSTR, ctypes.c_int]
-    _GetClassNameW.restype = ctypes.c_int
-
-    nMaxCount = 0x1000
-    dwCharSize = sizeof(WCHAR)
-    while 1:
-        lpClassName = ctypes.create_unicode_buffer(nMaxCount)
-        nCount = _GetClassNameW(hWnd, lpClassName, nMaxCount)
-        if nCount == 0:
-            raise ctypes.WinError()
-        if nCount < nMaxCount - dwCharSize:
-            break
-        nMaxCount += 0x1000
-    return str(lpClassName.value)
+    return _get_text(_GetClassNameW, ctypes.create_unicode_buffer,
+                     sizeof(WCHAR), hWnd)
 
 GetClassName = GuessStringType(GetClassNameA, GetClassNameW)
 
@@ -391,18 +455,10 @@ GetClassName = GuessStringType(GetClassNameA, GetClassNameW)
 #   __in_opt  LPCTSTR lpString
 # );
 def SetWindowTextA(hWnd, lpString=None):
-    _SetWindowTextA = windll.user32.SetWindowTextA
-    _SetWindowTextA.argtypes = [HWND, LPSTR]
-    _SetWindowTextA.restype = bool
-    _SetWindowTextA.errcheck = RaiseIfZero
     _SetWindowTextA(hWnd, lpString)
 
 
 def SetWindowTextW(hWnd, lpString=None):
-    _SetWindowTextW = windll.user32.SetWindowTextW
-    _SetWindowTextW.argtypes = [HWND, LPWSTR]
-    _SetWindowTextW.restype = bool
-    _SetWindowTextW.errcheck = RaiseIfZero
     _SetWindowTextW(hWnd, lpString)
 
 SetWindowText = GuessStringType(SetWindowTextA, SetWindowTextW)
@@ -415,20 +471,12 @@ SetWindowText = GuessStringType(SetWindowTextA, SetWindowTextW)
 #     LPARAM lParam
 # );
 def SendMessageA(hWnd, Msg, wParam=0, lParam=0):
-    _SendMessageA = windll.user32.SendMessageA
-    _SendMessageA.argtypes = [HWND, UINT, WPARAM, LPARAM]
-    _SendMessageA.restype = LRESULT
-
     wParam = MAKE_WPARAM(wParam)
     lParam = MAKE_LPARAM(lParam)
     return _SendMessageA(hWnd, Msg, wParam, lParam)
 
 
 def SendMessageW(hWnd, Msg, wParam=0, lParam=0):
-    _SendMessageW = windll.user32.SendMessageW
-    _SendMessageW.argtypes = [HWND, UINT, WPARAM, LPARAM]
-    _SendMessageW.restype = LRESULT
-
     wParam = MAKE_WPARAM(wParam)
     lParam = MAKE_LPARAM(lParam)
     return _SendMessageW(hWnd, Msg, wParam, lParam)
@@ -436,11 +484,29 @@ def SendMessageW(hWnd, Msg, wParam=0, lParam=0):
 SendMessage = GuessStringType(SendMessageA, SendMessageW)
 
 
-def FindWindowA(lpClassName=None, lpWindowName=None):
-    _FindWindowA = windll.user32.FindWindowA
-    _FindWindowA.argtypes = [LPSTR, LPSTR]
-    _FindWindowA.restype = HWND
+# BOOL IsWindow(
+#     HWND hWnd
+# );
+def IsWindow(hWnd):
+    return _IsWindow(hWnd)
+
+
+# BOOL IsChild(
+#     HWND hWndParent,
+#     HWND hWnd
+# );
+def IsChild(hWndParent, hWnd):
+    return _IsChild(hWndParent, hWnd)
+
+
+# HWND GetParent(
+#     HWND hWnd
+# );
+def GetParent(hWnd):
+    return _GetParent(hWnd)
+
 
+def FindWindowA(lpClassName=None, lpWindowName=None):
     hWnd = _FindWindowA(lpClassName, lpWindowName)
     if not hWnd:
         errcode = GetLastError()
@@ -450,10 +516,6 @@ def FindWindowA(lpClassName=None, lpWindowName=None):
 
 
 def FindWindowW(lpClassName=None, lpWindowName=None):
-    _FindWindowW = windll.user32.FindWindowW
-    _FindWindowW.argtypes = [LPWSTR, LPWSTR]
-    _FindWindowW.restype = HWND
-
     hWnd = _FindWindowW(lpClassName, lpWindowName)
     if not hWnd:
         errcode = GetLastError()
@@ -464,6 +526,163 @@ def FindWindowW(lpClassName=None, lpWindowName=None):
 FindWindow = GuessStringType(FindWindowA, FindWindowW)
 
 
+# DWORD GetWindowThreadProcessId(
+#     HWND hWnd,
+#     LPDWORD lpdwProcessId
+# );
+def GetWindowThreadProcessId(hWnd):
+    dwProcessId = DWORD(0)
+    _GetWindowThreadProcessId(hWnd, ctypes.byref(dwProcessId))
+    return dwProcessId.value
+
+
+# BOOL QueryFullProcessImageNameW(
+#     HANDLE hProcess,
+#     DWORD dwFlags,
+#     LPWSTR lpExeName,
+#     PDWORD lpdwSize
+# );
+def GetProcessImageName(dwProcessId):
+    """
+    Return the full path of the executable of a process or None if the
+    process can not be queried.
+    """
+    hProcess = _OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, FALSE,
+                            dwProcessId)
+    if not hProcess:
+        return None
+    try:
+        lpExeName = _buffers.get(ctypes.create_unicode_buffer, 0x400)
+        dwSize = DWORD(len(lpExeName))
+        if not _QueryFullProcessImageNameW(hProcess, 0, lpExeName,
+                                           ctypes.byref(dwSize)):
+            return None
+        return lpExeName.value
+    finally:
+        _CloseHandle(hProcess)
+
+
+# struct Sci_TextRange {
+#     struct Sci_CharacterRange { long cpMin; long cpMax; } chrg;
+#     char *lpstrText;
+# };
+class Sci_TextRange(Structure):
+    _fields_ = [("cpMin", LONG), ("cpMax", LONG), ("lpstrText", LPVOID)]
+
+
+class RemoteMemory(object):
+    """
+    A block of memory allocated in another process.
+
+    Needed for window messages like SCI_GETTEXTRANGE that take pointers,
+    which Windows does not marshal between processes.
+    """
+
+    def __init__(self, dwProcessId, size):
+        self.size = size
+        self.hProcess = _OpenProcess(
+            PROCESS_VM_OPERATION | PROCESS_VM_READ | PROCESS_VM_WRITE,
+            FALSE, dwProcessId)
+        if not self.hProcess:
+            raise ctypes.WinError()
+        try:
+            self.address = _VirtualAllocEx(self.hProcess, NULL, size,
+                                           MEM_COMMIT | MEM_RESERVE,
+                                           PAGE_READWRITE)
+        except OSError:
+            _CloseHandle(self.hProcess)
+            raise
+
+    def write(self, data, offset=0):
+        buf = ctypes.create_string_buffer(data, len(data))
+        _WriteProcessMemory(self.hProcess, self.address + offset, buf,
+                            len(data), None)
+
+    def read(self, size, offset=0):
+        buf = _buffers.get(ctypes.create_string_buffer, size)
+        _ReadProcessMemory(self.hProcess, self.address + offset, buf, size,
+                           None)
+        return buf.raw[:size]
+
+    def free(self):
+        if self.hProcess is None:
+            return
+        try:
+            _VirtualFreeEx(self.hProcess, self.address, 0, MEM_RELEASE)
+        finally:
+            _CloseHandle(self.hProcess)
+            self.hProcess = None
+
+
+class Win32Backend(object):
+    """
+    The real Win32 API, as used by L{Window}.
+
+    fakewin.FakeDesktop implements the same methods on a simulated window
+    tree, so that everything built on L{Window} can be run anywhere.
+    """
+
+    def enum_windows(self):
+        return EnumWindows()
+
+    def enum_child_windows(self, hWnd):
+        return EnumChildWindows(hWnd)
+
+    def get_class_name(self, hWnd):
+        return GetClassName(hWnd)
+
+    def get_window_text(self, hWnd):
+        try:
+            return GetWindowText(hWnd)
+        except OSError:
+            return None
+
+    def get_window_thread_process_id(self, hWnd):
+        return GetWindowThreadProcessId(hWnd)
+
+    def get_process_image_name(self, dwProcessId):
+        return GetProcessImageName(dwProcessId)
+
+    def is_window(self, hWnd):
+        return IsWindow(hWnd)
+
+    def is_child(self, hWndParent, hWnd):
+        return IsChild(hWndParent, hWnd)
+
+    def get_parent(self, hWnd):
+        return GetParent(hWnd)
+
+    def send_message(self, hWnd, uMsg, wParam=None, lParam=None):
+        return SendMessage(hWnd, uMsg, wParam, lParam)
+
+    def open_memory(self, dwProcessId, size):
+        return RemoteMemory(dwProcessId, size)
+
+
+backend = Win32Backend() if windll is not None else None
+
+
+def get_backend():
+    """
+    Return the backend windows are handled by.
+
+    Off Windows this is an empty simulated desktop unless another one
+    has been set with L{set_backend}.
+    """
+    global backend
+    if backend is None:
+        from . import fakewin
+        backend = fakewin.FakeDesktop()
+    return backend
+
+
+def set_backend(new_backend):
+    """Use another backend, e.g. a fakewin.FakeDesktop, return the old one."""
+    global backend
+    old_backend, backend = backend, new_backend
+    return old_backend
+
+
 class Window(object):
     def __init__(self, hWnd):
         self.hWnd = hWnd
@@ -474,29 +693,52 @@ class Window(object):
         return self.hWnd
 
     def get_classname(self):
-        return GetClassName(self.get_handle())
+        return get_backend().get_class_name(self.get_handle())
 
     def get_text(self):
-        try:
-            return GetWindowText(self.get_handle())
-        except WindowsError:
-            return None
+        return get_backend().get_window_text(self.get_handle())
+
+    def get_process_id(self):
+        return get_backend().get_window_thread_process_id(self.get_handle())
+
+    def is_valid(self):
+        """Return if the handle still identifies an existing window."""
+        return self.hWnd is not None and get_backend().is_window(self.hWnd)
+
+    def is_child_of(self, parent):
+        """Return if this window is a (nested) child of parent."""
+        return get_backend().is_child(parent.get_handle(), self.get_handle())
+
+    def get_parent(self):
+        """Return the parent window or None for a top-level window."""
+        hWnd = get_backend().get_parent(self.get_handle())
+        return Window(hWnd) if hWnd else None
 
     def find_child(self, text=None, cls=None):
-        childs = [Window(w) for w in EnumChildWindows(self.get_handle())]
-        for w in childs:
-            wndText = w.get_text()
-            wndCls = w.get_classname()
-            if text is None and cls is None:
-                return None
-            if text is None and cls in wndCls:
-                return w
-            if cls is None and text in wndText:
-                return w
-            if cls in wndCls and text is None:
-                return w
+        if text is None and cls is None:
+            return None
+        # Only query what is compared, most children have no text and
+        # fetching it costs a raised and caught WindowsError each.
+        for hWnd in get_backend().enum_child_windows(self.get_handle()):
+            w = Window(hWnd)
+            if text is None:
+                if cls in w.get_classname():
+                    return w
+            elif cls is None:
+                wndText = w.get_text()
+                if wndText is not None and text in wndText:
+                    return w
         return None
 
+    def find_children(self, cls):
+        """Return all (nested) children whose class contains cls."""
+        children = []
+        for hWnd in get_backend().enum_child_windows(self.get_handle()):
+            w = Window(hWnd)
+            if cls in w.get_classname():
+                children.append(w)
+        return children
+
     def send(self, uMsg, wParam=None, lParam=None, dwTimeout=None):
         """
         Send a low-level window message syncronically.
@@ -518,12 +760,18 @@ class Window(object):
             Typically a value of C{0} means an error occured. You can get the
             error code by calling L{win32.GetLastError}.
         """
-        return SendMessage(self.get_handle(), uMsg, wParam, lParam)
+        return get_backend().send_message(self.get_handle(), uMsg, wParam,
+                                          lParam)
+
+    @classmethod
+    def list_windows(cls):
+        """Return all top-level windows."""
+        return [Window(h) for h in get_backend().enum_windows()]
 
     @classmethod
     def find_windows(cls, text, return_on_first_match=False):
         windows = []
-        for w in [Window(h) for h in EnumWindows()]:
+        for w in cls.list_windows():
             window_text = w.get_text()
 
             # Handle special characters in ST2